@@ -2,4 +2,6 @@
 
 from .pdfa import PDFAutomation
 from .logging import Logging
+from .job_queue import JobQueue, run_worker
+from .service import LedgerService, ServiceClient
 from .handlers import *
\ No newline at end of file
@@ -2,4 +2,11 @@
 
 from .excel_handler import ExcelHandler
 from .pdf_handler import PDFHandler
-from .gui_handler import GUI
\ No newline at end of file
+from .gui_handler import GUI
+from .export_handler import ExportHandler
+from .record_store import OrderRecordStore
+from .bloom_filter import BloomFilter
+from .checkpoint_handler import CheckpointHandler
+from .rollup_handler import RollupHandler
+from .storage_backend import StorageBackend, ParquetArchive
+from .federated_search import FederatedSearch
@@ -0,0 +1,178 @@
+
+# This file contains the BloomFilter class
+
+# IMPORTS!
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import time
+from contextlib import contextmanager
+
+class BloomFilter:
+    """A Bloom filter over order numbers, persisted to a small binary file.
+
+    It can tell that an order number is definitely new without touching any workbook. A hit only means
+    the order number is possibly known, in which case the caller has to do an exact lookup.
+
+    Several processes can share one filter file, saving with merge=True keeps the bits the others have
+    added, and file_version tells whether the file has changed since it was last read.
+    """
+
+    __magic: bytes = b'BWBF'                    # First bytes of a persisted filter file
+    __header = struct.Struct('<4sQIQQd')        # magic, bits, hashes, count, capacity, error_rate
+
+    # constructor
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 0.001) -> None:
+        """Initialize an empty BloomFilter instance.
+
+        Args:
+            capacity (int): Number of order numbers the filter is sized for.
+            error_rate (float): False positive rate once the filter holds capacity order numbers.
+        """
+        # Validations!
+        assert type(capacity) == int and capacity > 0, "capacity needs to be a positive int"
+        assert 0 < error_rate < 1, "error_rate needs to be between 0 and 1"
+
+        # initializing, the usual optimal sizes m = -n ln(p) / ln(2)^2 and k = m/n ln(2)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+        self.__array = bytearray(math.ceil(self.bits / 8))
+
+    # _positions
+    def _positions(self, order_number):
+        """Bit positions of an order number, using double hashing over one blake2b digest.
+        """
+        digest = hashlib.blake2b(str(order_number).encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.bits
+
+    # add
+    def add(self, order_number) -> None:
+        """Adds an order number to the filter.
+        """
+        for position in self._positions(order_number):
+            self.__array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    # update
+    def update(self, order_numbers) -> None:
+        """Adds every order number of the given iterable.
+        """
+        for order_number in order_numbers:
+            self.add(order_number)
+
+    # __contains__
+    def __contains__(self, order_number) -> bool:
+        """False means the order number was never added, True means it possibly was.
+        """
+        for position in self._positions(order_number):
+            if not self.__array[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    # merge
+    def merge(self, other) -> None:
+        """Adds every order number of another filter of the same size to this one.
+        """
+        assert self.bits == other.bits and self.hashes == other.hashes, "only filters of the same size can be merged"
+        # or-ing the whole bit arrays as two big ints, much faster than a python loop over the bytes
+        merged = int.from_bytes(self.__array, 'little') | int.from_bytes(other.__array, 'little')
+        self.__array = bytearray(merged.to_bytes(len(self.__array), 'little'))
+        self.count = max(self.count, other.count)
+
+    # save
+    def save(self, filename: str, merge: bool = False):
+        """Writes the filter to a temporary file and atomically renames it over the given file.
+
+        Args:
+            filename (str): File to write the filter to.
+            merge (bool): If True, the order numbers already in the file, e.g. added by another process, are merged
+                into this filter first so they aren't lost. A file of another size is overwritten.
+
+        Returns:
+            tuple: file_version of the written file.
+        """
+        directory = os.path.dirname(os.path.abspath(filename))
+        # other processes sharing the file save one at a time, so no merge reads a file that is about to be replaced
+        with self._lock(filename):
+            if merge and os.path.exists(filename):
+                saved = self.load(filename)
+                if saved.bits == self.bits and saved.hashes == self.hashes:
+                    self.merge(saved)
+            fd, temp_filename = tempfile.mkstemp(prefix=".bloom-", dir=directory)
+            try:
+                with os.fdopen(fd, 'wb') as file:
+                    file.write(self.__header.pack(self.__magic, self.bits, self.hashes, self.count, self.capacity, self.error_rate))
+                    file.write(self.__array)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_filename, filename)
+            finally:
+                if os.path.exists(temp_filename):
+                    os.remove(temp_filename)
+            return self.file_version(filename)
+
+    # file_version
+    @staticmethod
+    def file_version(filename: str):
+        """Returns:
+            _type_: None if the file doesn't exist else a tuple that changes whenever the file is replaced.
+        """
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_ino, stat.st_size)
+
+    # _lock
+    @staticmethod
+    @contextmanager
+    def _lock(filename: str, timeout: float = 10.0, stale_after: float = 30.0):
+        """Holds a lock file next to the filter file, portable across Windows and Linux.
+        """
+        lock_filename = filename + ".lock"
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                os.close(os.open(lock_filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                break
+            except FileExistsError:
+                pass
+            # a process killed while saving leaves its lock file behind
+            try:
+                if time.time() - os.path.getmtime(lock_filename) > stale_after:
+                    os.remove(lock_filename)
+                    continue
+            except FileNotFoundError:
+                continue
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"{lock_filename} is held by another process")
+            time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if os.path.exists(lock_filename):
+                os.remove(lock_filename)
+
+    # load
+    @classmethod
+    def load(cls, filename: str):
+        """Reads a filter written by save.
+        """
+        with open(filename, 'rb') as file:
+            header = file.read(cls.__header.size)
+            magic, bits, hashes, count, capacity, error_rate = cls.__header.unpack(header)
+            assert magic == cls.__magic, f"{filename} is not a bloom filter file"
+            bloom = cls(capacity=capacity, error_rate=error_rate)
+            data = bytearray(file.read())
+        assert bloom.bits == bits and bloom.hashes == hashes and len(data) == len(bloom.__array), f"{filename} is corrupted"
+        bloom.count = count
+        bloom.__array = data
+        return bloom
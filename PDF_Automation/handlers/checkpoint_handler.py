@@ -0,0 +1,110 @@
+
+# This file contains the CheckpointHandler class
+
+# IMPORTS!
+import hashlib
+import json
+import os
+import tempfile
+
+class CheckpointHandler:
+    """Responsible for keeping the extraction progress of PDFs on the disk, so that a failed or killed run
+    can resume from the last completed page instead of extracting the whole PDF again.
+
+    Checkpoints are keyed by the SHA-256 of the PDF, so renaming or moving the file doesn't matter.
+    Once the orders of a PDF are saved to the ledger the checkpoint is marked as committed, and running
+    the same PDF again doesn't commit them a second time, as long as they are all still in the ledger.
+    """
+
+    __directory: str = None                     # Directory containing the checkpoint files
+
+    # constructor
+    def __init__(self, directory: str) -> None:
+        """Initialize a CheckpointHandler instance, creating the directory if it doesn't exist yet.
+        """
+        # Validations!
+        assert type(directory) == str, "directory needs to be string"
+        assert directory != "", "directory cannot be none"
+
+        # initializing
+        self.__directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    # file_hash
+    @staticmethod
+    def file_hash(filename: str) -> str:
+        """SHA-256 of a file, read in chunks.
+        """
+        digest = hashlib.sha256()
+        with open(filename, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    # _checkpoint_filename
+    def _checkpoint_filename(self, file_hash: str) -> str:
+        return os.path.join(self.__directory, f"{file_hash}.json")
+
+    # load
+    def load(self, file_hash: str):
+        """Reads the checkpoint of a PDF.
+
+        Returns:
+            _type_: None if there is no checkpoint else a dict with "o_type", "next_page", "orders", "committed"
+            and "flagged_pages".
+        """
+        try:
+            with open(self._checkpoint_filename(file_hash), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    # save
+    def save(self, file_hash: str, o_type: str, next_page: int, orders, committed: bool = False,
+             flagged_pages: list = None) -> None:
+        """Writes the checkpoint of a PDF to a temporary file and atomically renames it into place,
+        so a crash while checkpointing leaves the previous checkpoint intact.
+
+        Args:
+            file_hash (str): SHA-256 of the PDF.
+            o_type (str): Type of the orders being extracted.
+            next_page (int): Index of the first page that hasn't been extracted yet.
+            orders (iterable): Order details extracted from the pages before next_page.
+            committed (bool): True once the orders have been saved to the ledger.
+            flagged_pages (list): (page_number, reason) of pages skipped in isolated mode before next_page.
+        """
+        state = {
+            "o_type": o_type,
+            "next_page": next_page,
+            "orders": [list(order) for order in orders],
+            "committed": committed,
+            "flagged_pages": [list(page) for page in (flagged_pages or [])],
+        }
+        fd, temp_filename = tempfile.mkstemp(prefix=".checkpoint-", dir=self.__directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(state, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_filename, self._checkpoint_filename(file_hash))
+        finally:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+    # mark_committed
+    def mark_committed(self, file_hash: str) -> None:
+        """Marks the orders of a PDF as saved to the ledger. The orders are kept, so that a later run can tell
+        whether they are all still in the ledger, e.g. after restoring an older generation of it.
+        """
+        state = self.load(file_hash)
+        if state is None:
+            return
+        self.save(file_hash, o_type=state["o_type"], next_page=state["next_page"], orders=state["orders"],
+                  committed=True, flagged_pages=state.get("flagged_pages"))
+
+    # remove
+    def remove(self, file_hash: str) -> None:
+        """Deletes the checkpoint of a PDF, the next run extracts and commits it from scratch.
+        """
+        if os.path.exists(self._checkpoint_filename(file_hash)):
+            os.remove(self._checkpoint_filename(file_hash))
@@ -2,10 +2,18 @@
 # This file contains the ExcelHandler class
 
 # IMPORTS!
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, Future
 import openpyxl
 from openpyxl.worksheet.worksheet import Worksheet
 from openpyxl.workbook.workbook import Workbook
 from .gui_handler import GUI
+from .record_store import OrderRecordStore
+from .bloom_filter import BloomFilter
+from .rollup_handler import RollupHandler
+from .storage_backend import StorageBackend
 
 class ExcelHandler:
     """This class is reponsible for handling excel related functionality such as reading, appending, removing, copying etc.
@@ -13,21 +21,45 @@ class ExcelHandler:
 
     __excel_filename: str = ''              # Name of the excel file that is being managed
     __logger = None                         # Logger object
+    __generations: int = 3                  # Number of previous ledger copies kept by background saves
+    __save_executor = None                  # Single worker thread running background saves in order
+    __pending_save: Future = None           # Future of the last submitted background save
+    __archive_filenames: list = None        # Archived ledgers that are also checked for duplicate orders
+    __archive_records: dict = None          # filename -> (mtime, OrderRecordStore), loaded on the first possible hit
+    __bloom_filename: str = None            # File the duplicate order bloom filter is persisted to
+    __bloom_filter: BloomFilter = None      # Bloom filter over every known order number
+    __bloom_version: tuple = None           # BloomFilter.file_version of the bloom file when it was last read or written
+    __rollups: RollupHandler = None         # Order counts per date and user, kept in sync with the ledger
+    __rollups_stale: bool = False           # True if a save failed after the rollups had been updated
+    __backends: list = None                 # Storages kept in sync with the ledger, e.g. a ParquetArchive
+    __search_backend: StorageBackend = None # Backend searches are answered from instead of the xlsx file
+    __pending_backend_rows: list = None     # Orders written since the last save, appended to the backends once saved
 
     # constructor
-    def __init__(self, logger: None, filename: str) -> None:
+    def __init__(self, logger: None, filename: str, generations: int = 3) -> None:
         """Initialize an ExcelHandler instance.
         """
         # Validating filename
         assert type(filename) == str, "Excel filename needs to be string"
         assert filename != "", "Excel filename cannot be none"
+        assert type(generations) == int and generations >= 0, "generations needs to be a non-negative int"
         
         # initializing
         self.__logger = logger
         self.__excel_filename = filename
+        self.__generations = generations
+        self.__backends = []
+        self.__pending_backend_rows = []
         if self.__logger.verbose:
             self.__logger.write(f"[EXCEL_HANDLER] excel_filename={self.__excel_filename}\n")
 
+    # filename
+    @property
+    def filename(self) -> str:
+        """Name of the excel file that is being managed.
+        """
+        return self.__excel_filename
+
     # open_file
     def open_file(self, headers: list, create_file: bool) -> openpyxl.Workbook:
         """Opens an Excel file, it also checks either the file aready exists or not,
@@ -41,6 +73,11 @@ class ExcelHandler:
                 _type_: None else openpyxl.Workbook instance.
         """
         wb = None
+        # a background save may still be renaming the file into place
+        self.wait_for_save()
+        self._discard_stale_rollups()
+        # orders written to a workbook that has never been saved aren't in the ledger being opened
+        self.__pending_backend_rows = []
         # opening the excel file
         try:
             wb = openpyxl.load_workbook(filename=self.__excel_filename)
@@ -57,79 +94,413 @@ class ExcelHandler:
                 ws.title = "Order_Details"
                 # saving the workbook
                 wb.save(self.__excel_filename)
+                # a new ledger holds no orders yet, so the backends start out in sync with it
+                for backend in self.__backends:
+                    backend.mark_synced(self.__excel_filename, None)
             else:
                 return 102
         
         return wb
     
     # search
-    def search(self, _type: str, search_value: str, excel_filename: str):
+    def search(self, _type: str, search_value: str, excel_filename: str, records: OrderRecordStore = None):
         """Search for the order details from the given Excel file.
+        If records are given (see load_records), they are searched instead of reading the file again.
         """
-        # opening the Excel file and don't create a new one 
-        wb = self.open_file(headers=None, create_file=False)
-        # searching 
-        if wb == 102:
+        if records is not None:
+            results = list(records.search(_type=_type, search_value=search_value))
+            return (100, results) if results else (103, results)
+        # making sure the Excel file exists, don't create a new one
+        self.wait_for_save()
+        if not os.path.exists(self.__excel_filename):
             # it means that the file didn't exist
             # need to prompt an error message to the user
             message = {
                 "title": "No Data",
                 "message": "The Excel file doesn't exist yet.\nProcess a PDF first to create the database."
             }
-            GUI.prompt_error(code=wb, message=message)
-            return (102, wb)   # will return 102 as its status code
-        # if wb is OK
-        results = []
-        ws = wb.active
-        find = False
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            # skipping empty rows, just in case
-            if not row[0]:
-                continue
-            # now, searching on the basis of type
-            if _type == "order":
-                if str(row[0]) == search_value:
-                    if not find:
-                        find = True
-                    results.append(row)
-            elif _type == "date":
-                if row[1] == search_value:
-                    if not find:
-                        find = True
-                    results.append(row)
-            elif _type == "user":
-                if row[3] and search_value.lower() in str(row[3]).lower():
-                    if not find:
-                        find = True
-                    results.append(row)
-        if find:
+            GUI.prompt_error(code=102, message=message)
+            return (102, 102)   # will return 102 as its status code
+        # if the file is OK
+        results = list(self.iter_search(_type=_type, search_value=search_value))
+        if results:
             return (100, results)
         else:
             return (103, results)
 
+    # iter_search
+    def iter_search(self, _type: str, search_value: str):
+        """Yields the matching rows one at a time, reading the Excel file in read only mode
+        so that the whole ledger is never held in memory.
+
+        Args:
+            _type (str): It can be either ["order", "date", "user"]
+            search_value (str): Value to search for.
+        """
+        # a columnar backend only reads the needed columns and row groups
+        backend = self._synced_search_backend()
+        if backend is not None:
+            yield from backend.search(_type=_type, search_value=search_value)
+            return
+        wb = openpyxl.load_workbook(filename=self.__excel_filename, read_only=True)
+        try:
+            ws = wb.active
+            for row in ws.iter_rows(min_row=2, values_only=True):
+                # skipping empty rows, just in case
+                if not row or not row[0]:
+                    continue
+                if self._matches(row, _type, search_value):
+                    yield row
+        finally:
+            # read only workbooks keep the file open until closed
+            wb.close()
+
+    # load_records
+    def load_records(self) -> OrderRecordStore:
+        """Reads the whole ledger into a compact OrderRecordStore, which can then be searched repeatedly.
+
+        Returns:
+            _type_: 102 if the file doesn't exist else OrderRecordStore instance.
+        """
+        self.wait_for_save()
+        if not os.path.exists(self.__excel_filename):
+            return 102
+        backend = self._synced_search_backend()
+        if backend is not None:
+            records = OrderRecordStore.from_rows(backend.iter_rows())
+        else:
+            wb = openpyxl.load_workbook(filename=self.__excel_filename, read_only=True)
+            try:
+                records = OrderRecordStore.from_rows(wb.active.iter_rows(min_row=2, values_only=True))
+            finally:
+                wb.close()
+        if self.__logger.verbose:
+            self.__logger.write(f"[EXCEL_HANDLER] loaded {len(records)} records, {records.nbytes()} bytes\n")
+        return records
+
+    # _matches
+    @staticmethod
+    def _matches(row, _type: str, search_value: str) -> bool:
+        """Checks a ledger row against the search value on the basis of type.
+        """
+        if _type == "order":
+            return str(row[0]) == search_value
+        elif _type == "date":
+            return len(row) > 1 and row[1] == search_value
+        elif _type == "user":
+            return len(row) > 3 and bool(row[3]) and search_value.lower() in str(row[3]).lower()
+        return False
+
+    # configure_duplicate_filter
+    def configure_duplicate_filter(self, bloom_filename: str, archive_filenames: list = None,
+                                   capacity: int = 1_000_000, error_rate: float = 0.001):
+        """Enables the bloom filter prefilter for duplicate checks in write.
+
+        Order numbers that the filter has never seen are known to be new without touching any workbook,
+        only possible hits are looked up in the ledger and the archives. The filter is built from the
+        ledger and the archives the first time, and then updated on every write.
+
+        Args:
+            bloom_filename (str): File to persist the filter to, e.g. boltworld.bloom
+            archive_filenames (list): Archived ledgers that are also checked for duplicate orders.
+            capacity (int): Number of order numbers the filter is sized for.
+            error_rate (float): False positive rate once the filter holds capacity order numbers.
+        """
+        # Validating bloom_filename
+        assert type(bloom_filename) == str, "bloom_filename needs to be string"
+        assert bloom_filename != "", "bloom_filename cannot be none"
+
+        self.__bloom_filename = bloom_filename
+        self.__archive_filenames = list(archive_filenames or [])
+        self.__archive_records = {}
+
+        if os.path.exists(bloom_filename):
+            version = BloomFilter.file_version(bloom_filename)
+            bloom = BloomFilter.load(bloom_filename)
+            # resizing means building it again from the ledgers
+            if bloom.capacity == capacity and bloom.error_rate == error_rate:
+                self.__bloom_filter = bloom
+                self.__bloom_version = version
+                if self.__logger.verbose:
+                    self.__logger.write(f"[EXCEL_HANDLER] bloom filter loaded, count={bloom.count}\n")
+                return
+        self.rebuild_duplicate_filter(capacity=capacity, error_rate=error_rate)
+
+    # rebuild_duplicate_filter
+    def rebuild_duplicate_filter(self, capacity: int = None, error_rate: float = None):
+        """Builds the bloom filter again from the ledger and the archives.
+        Needed if the ledger has been edited outside of this program.
+        """
+        assert self.__bloom_filename is not None, "configure_duplicate_filter needs to be called first"
+        self.wait_for_save()
+        if capacity is None:
+            capacity = self.__bloom_filter.capacity
+        if error_rate is None:
+            error_rate = self.__bloom_filter.error_rate
+
+        bloom = BloomFilter(capacity=capacity, error_rate=error_rate)
+        for filename in [self.__excel_filename] + self.__archive_filenames:
+            records = self._load_order_numbers(filename)
+            if records is not None:
+                bloom.update(records.order_numbers())
+        self.__bloom_version = bloom.save(self.__bloom_filename)
+        self.__bloom_filter = bloom
+        if self.__logger.verbose:
+            self.__logger.write(f"[EXCEL_HANDLER] bloom filter rebuilt, count={bloom.count}\n")
+
+    # _refresh_duplicate_filter
+    def _refresh_duplicate_filter(self):
+        """Reads the bloom file again if another process has saved it since, other programs sharing
+        the ledger add their order numbers to the same file.
+        """
+        if self.__bloom_filter is None:
+            return
+        version = BloomFilter.file_version(self.__bloom_filename)
+        if version is None or version == self.__bloom_version:
+            return
+        saved = BloomFilter.load(self.__bloom_filename)
+        if saved.bits == self.__bloom_filter.bits and saved.hashes == self.__bloom_filter.hashes:
+            self.__bloom_filter.merge(saved)
+        else:
+            # rebuilt with another size by some other process
+            self.__bloom_filter = saved
+        self.__bloom_version = version
+        if self.__logger.verbose:
+            self.__logger.write(f"[EXCEL_HANDLER] bloom filter reloaded, count={self.__bloom_filter.count}\n")
+
     # write
-    def write(self, worksheet: Worksheet, data, duplication_list: bool):
+    def write(self, worksheet: Worksheet, data, duplication_list: bool = True, show_duplicates: bool = True) -> list:
         """Writes order details on the excel file.
+        Orders that already exist are skipped if duplication_list is True.
+
+        Args:
+            show_duplicates (bool): If True, skipped orders are shown in a seperate window.
+
+        Returns:
+            list: Order numbers that have been skipped as duplicates.
         """
+        duplicate_orders = []
+        written_orders = []
+        batch_orders = set()            # orders written by this call, data can hold the same order twice
+        existing_orders = None          # orders of the worksheet, only fetched when they are needed
+        # picking up the order numbers other processes have saved since the filter was read
         if duplication_list:
-            # need to check for duplicate orders before adding
-            duplicate_orders = []
-            # fetch existing orders from excel
-            existing_orders = set()
-            for row in worksheet.iter_rows(max_col=1, min_row=2, values_only=True):
-                existing_orders.add(row[0])
+            self._refresh_duplicate_filter()
         for order in data:
             if duplication_list:
-                if order[0] in existing_orders:
+                key = OrderRecordStore._order_key(order[0])
+                if key in batch_orders:
                     duplicate_orders.append(order[0])
-            else:
-                worksheet.append(order)
-        
+                    continue
+                batch_orders.add(key)
+                # the bloom filter answers "definitely new" for most orders, without an exact lookup
+                if self.__bloom_filter is None or order[0] in self.__bloom_filter:
+                    if existing_orders is None:
+                        # fetch existing orders from excel, kept in a compact int64 array rather than a set of boxed ints
+                        existing_orders = OrderRecordStore.from_rows(worksheet.iter_rows(max_col=1, min_row=2, values_only=True))
+                    if order[0] in existing_orders or self._in_archives(order[0]):
+                        duplicate_orders.append(order[0])
+                        continue
+            worksheet.append(order)
+            written_orders.append(order[0])
+            if self.__rollups is not None:
+                self.__rollups.update([order])
+            if self.__backends:
+                self.__pending_backend_rows.append(list(order))
+
+        # the filter is updated before the workbook is saved, a failed save only leaves extra
+        # bits set which are caught by the exact lookup later on
+        if self.__bloom_filter is not None and written_orders:
+            self.__bloom_filter.update(written_orders)
+            # merging with the file, so the order numbers other processes have saved meanwhile are kept
+            self.__bloom_version = self.__bloom_filter.save(self.__bloom_filename, merge=True)
+
         # if there are duplicate orders, show in a seperate window
-        if duplication_list:
+        if duplication_list and show_duplicates:
             if duplicate_orders:
                 GUI.show_duplicate_orders(duplicate_orders)
 
+        return duplicate_orders
+
+    # has_orders
+    def has_orders(self, order_numbers) -> bool:
+        """Checks whether every given order number is in the ledger or in one of the archives.
+        """
+        self.wait_for_save()
+        records = self._load_order_numbers(self.__excel_filename)
+        for order_number in order_numbers:
+            if records is not None and order_number in records:
+                continue
+            if not self._in_archives(order_number):
+                return False
+        return True
+
+    # _in_archives
+    def _in_archives(self, order_number) -> bool:
+        """Exact lookup of an order number in the archived ledgers.
+        """
+        if not self.__archive_filenames:
+            return False
+        for filename in self.__archive_filenames:
+            records = self._load_order_numbers(filename)
+            if records is not None and order_number in records:
+                return True
+        return False
+
+    # _load_order_numbers
+    def _load_order_numbers(self, filename: str) -> OrderRecordStore:
+        """Loads the order numbers of a ledger, archives are cached until their file changes.
+
+        Returns:
+            _type_: None if the file doesn't exist else OrderRecordStore instance.
+        """
+        if not os.path.exists(filename):
+            return None
+        is_archive = filename != self.__excel_filename
+        mtime = os.path.getmtime(filename)
+        if is_archive and filename in self.__archive_records:
+            cached_mtime, records = self.__archive_records[filename]
+            if cached_mtime == mtime:
+                return records
+
+        wb = openpyxl.load_workbook(filename=filename, read_only=True)
+        try:
+            records = OrderRecordStore.from_rows(wb.active.iter_rows(max_col=1, min_row=2, values_only=True))
+        finally:
+            wb.close()
+        if is_archive:
+            self.__archive_records[filename] = (mtime, records)
+        return records
+
+    # configure_rollups
+    def configure_rollups(self, filename: str):
+        """Enables the order count rollups, which are updated on every write and saved along with the ledger.
+        They are built from the ledger if the file doesn't exist yet.
+
+        Args:
+            filename (str): File to persist the rollups to, e.g. boltworld.rollups.json
+        """
+        exists = os.path.exists(filename)
+        self.__rollups = RollupHandler(filename=filename)
+        if not exists:
+            self.rebuild_rollups()
+
+    # get_rollups
+    def get_rollups(self) -> RollupHandler:
+        """Returns:
+            _type_: None if the rollups are not enabled else RollupHandler instance matching the saved ledger.
+        """
+        if self.__rollups is not None:
+            self._discard_stale_rollups()
+            # other processes sharing the ledger save their counts to the same file
+            self.__rollups.refresh()
+        return self.__rollups
+
+    # rebuild_rollups
+    def rebuild_rollups(self) -> int:
+        """Recounts the rollups from the ledger, in case they have drifted, e.g. after editing the ledger in Excel.
+
+        Returns:
+            int: 102 if the ledger doesn't exist yet else 100.
+        """
+        assert self.__rollups is not None, "configure_rollups needs to be called first"
+        self.wait_for_save()
+        if not os.path.exists(self.__excel_filename):
+            self.__rollups.rebuild([])
+            return 102
+        wb = openpyxl.load_workbook(filename=self.__excel_filename, read_only=True)
+        try:
+            self.__rollups.rebuild(wb.active.iter_rows(min_row=2, values_only=True))
+        finally:
+            wb.close()
+        self.__rollups_stale = False
+        if self.__logger.verbose:
+            self.__logger.write(f"[EXCEL_HANDLER] rollups rebuilt, dates={len(self.__rollups.by_date)}\n")
+        return 100
+
+    # _discard_stale_rollups
+    def _discard_stale_rollups(self):
+        """Goes back to the saved rollups if the ledger couldn't be saved after they had been updated.
+        """
+        if self.__rollups_stale:
+            self.__rollups.reload()
+            self.__rollups_stale = False
+
+    # add_backend
+    def add_backend(self, backend: StorageBackend, use_for_search: bool = False):
+        """Keeps another storage in sync with the ledger, every order saved to the ledger is appended to it.
+        Existing ledgers need to be copied over once, e.g. with ParquetArchive.migrate_from_xlsx.
+        Searches read the xlsx file while the backend is behind it, see StorageBackend.is_synced.
+
+        Args:
+            backend (StorageBackend): e.g. a ParquetArchive
+            use_for_search (bool): If True, search and iter_search read from this backend instead of the xlsx file.
+        """
+        assert isinstance(backend, StorageBackend), "backend needs to be StorageBackend"
+        self.__backends.append(backend)
+        if use_for_search:
+            self.__search_backend = backend
+
+    # _synced_search_backend
+    def _synced_search_backend(self) -> StorageBackend:
+        """Returns:
+            _type_: The search backend, or None if searches have to read the xlsx file, e.g. because rows
+            were added in Excel or by a desk without the backend since it was last migrated.
+        """
+        backend = self.__search_backend
+        if backend is None or backend.is_synced(self.__excel_filename):
+            return backend
+        if self.__logger.verbose:
+            self.__logger.write(f"[EXCEL_HANDLER] {type(backend).__name__} is behind {self.__excel_filename}, searching the xlsx file\n")
+        return None
+
+    # _after_save
+    def _after_save(self, saved: bool, rollups_changes: dict, backend_rows: list, previous_version: list = None):
+        """Persists the rollups and appends the saved orders to the backends once the ledger is on the disk,
+        or marks the rollups stale if the save failed for whatever reason.
+        previous_version is StorageBackend.ledger_version of the ledger right before it was saved.
+        """
+        if saved:
+            for backend in self.__backends:
+                try:
+                    backend.append(backend_rows)
+                    backend.mark_synced(self.__excel_filename, previous_version)
+                except Exception as e:
+                    # the ledger is saved already, the backend has to be migrated again to catch up
+                    self.__logger.write(f"[EXCEL_HANDLER] appending to {type(backend).__name__} failed, {e!r}\n")
+                    self._mark_backend_stale(backend)
+        else:
+            # the rows go out with the next save of the same workbook, open_file drops them
+            self.__pending_backend_rows = backend_rows + self.__pending_backend_rows
+        if self.__rollups is None:
+            return
+        if not saved:
+            self.__rollups_stale = True
+            return
+        try:
+            self.__rollups.save(changes=rollups_changes)
+        except Exception as e:
+            # the counts in memory match the ledger, the next save writes them again
+            self.__logger.write(f"[EXCEL_HANDLER] saving the rollups failed, {e!r}\n")
+
+    # _mark_backend_stale
+    def _mark_backend_stale(self, backend: StorageBackend):
+        """Stops answering searches from a backend that is missing saved orders.
+        """
+        if backend is self.__search_backend:
+            self.__search_backend = None
+            self.__logger.write(f"[EXCEL_HANDLER] searches read {self.__excel_filename} again\n")
+        try:
+            backend.mark_stale()
+        except Exception as e:
+            self.__logger.write(f"[EXCEL_HANDLER] marking {type(backend).__name__} stale failed, {e!r}\n")
+
+    # _take_pending_backend_rows
+    def _take_pending_backend_rows(self) -> list:
+        rows = self.__pending_backend_rows
+        self.__pending_backend_rows = []
+        return rows
+
     # save
     def save(self, workbook: Workbook):
         """Saves the specified worksheet
@@ -137,6 +508,20 @@ class ExcelHandler:
         Args:
             worksheet (Worksheet): An instance of openpyxl.workbook.workbook.
         """
+        rollups_changes = self.__rollups.take_changes() if self.__rollups is not None else None
+        backend_rows = self._take_pending_backend_rows()
+        previous_version = StorageBackend.ledger_version(self.__excel_filename)
+        saved = False
+        try:
+            code = self._save_workbook(workbook)
+            saved = code is None
+            return code
+        finally:
+            # also runs if the save raised, e.g. the disk is full
+            self._after_save(saved, rollups_changes, backend_rows, previous_version)
+
+    # _save_workbook
+    def _save_workbook(self, workbook: Workbook):
         try:
             workbook.save(self.__excel_filename)
         except PermissionError:
@@ -160,7 +545,145 @@ class ExcelHandler:
                 workbook.save(self.__excel_filename)
             except PermissionError:
                 return 101
-            
+
+    # save_in_background
+    def save_in_background(self, workbook: Workbook) -> Future:
+        """Saves the workbook on a background thread.
+
+        The workbook itself is handed over to the background thread, so styles, number formats and column
+        widths are kept, and it must not be modified afterwards; open_file waits for the save and loads the
+        ledger again. The background thread saves it to a temporary file next to the ledger, fsyncs it and
+        atomically renames it into place, keeping the last few generations for recovery.
+
+        Args:
+            workbook (Workbook): An instance of openpyxl.workbook.workbook.
+
+        Returns:
+            Future: Resolves to None once saved, or 101 if the ledger is locked by another program.
+        """
+        rollups_changes = self.__rollups.take_changes() if self.__rollups is not None else None
+        backend_rows = self._take_pending_backend_rows()
+        # saves are queued on a single thread so that they land on the disk in order
+        if self.__save_executor is None:
+            self.__save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="excel-save")
+        self.__pending_save = self.__save_executor.submit(self._write_workbook, workbook, rollups_changes, backend_rows)
+        return self.__pending_save
+
+    # wait_for_save
+    def wait_for_save(self):
+        """Blocks until the last background save has finished. A failed save is only logged here,
+        the Future returned by save_in_background raises it for whoever submitted the save.
+
+        Returns:
+            _type_: None, or 101 if the last background save was denied.
+        """
+        save = self.__pending_save
+        if save is None:
+            return None
+        try:
+            return save.result()
+        except Exception as e:
+            self.__logger.write(f"[EXCEL_HANDLER] background save failed for {self.__excel_filename}, {e!r}\n")
+            return None
+        finally:
+            # saves run in order, once the last one is done there is nothing left to wait for
+            if self.__pending_save is save:
+                self.__pending_save = None
+
+    # generations
+    def generations(self) -> list:
+        """Lists the previous copies of the ledger kept by background saves, newest first.
+        """
+        files = []
+        for i in range(1, self.__generations + 1):
+            name = self._generation_filename(i)
+            if os.path.exists(name):
+                files.append(name)
+        return files
+
+    # _generation_filename
+    def _generation_filename(self, generation: int) -> str:
+        """Name of a kept generation, e.g. boltworld.1.xlsx. The extension is kept last so openpyxl can still load it.
+        """
+        root, ext = os.path.splitext(self.__excel_filename)
+        return f"{root}.{generation}{ext}"
+
+    # _write_workbook
+    def _write_workbook(self, workbook: Workbook, rollups_changes: dict = None, backend_rows: list = None):
+        """Saves a workbook to a temporary file and atomically renames it over the ledger.
+        Runs on the background save thread.
+        """
+        directory = os.path.dirname(os.path.abspath(self.__excel_filename))
+        saved = False
+        previous_version = None
+        fd, temp_filename = tempfile.mkstemp(suffix=".xlsx", prefix=".saving-", dir=directory)
+        os.close(fd)
+        try:
+            workbook.save(temp_filename)
+            # making sure the bytes are on the disk before the rename
+            with open(temp_filename, 'rb+') as file:
+                os.fsync(file.fileno())
+
+            previous_filename = self._link_previous(directory)
+            previous_version = StorageBackend.ledger_version(self.__excel_filename)
+            try:
+                os.replace(temp_filename, self.__excel_filename)
+                saved = True
+                # rotating only once the new ledger is in place, a denied rename leaves the generations untouched
+                self._rotate_generations(previous_filename)
+            finally:
+                if previous_filename is not None and os.path.exists(previous_filename):
+                    os.remove(previous_filename)
+        except PermissionError:
+            # the ledger is opened by some other program (Excel locks it on Windows)
+            if self.__logger.verbose:
+                self.__logger.write(f"[EXCEL_HANDLER] background save denied for {self.__excel_filename}\n")
+            return 101
+        finally:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+            # also runs if the save raised, e.g. the disk is full
+            self._after_save(saved, rollups_changes, backend_rows or [], previous_version)
+
+        if self.__logger.verbose:
+            self.__logger.write(f"[EXCEL_HANDLER] background save finished for {self.__excel_filename}\n")
+
+    # _link_previous
+    def _link_previous(self, directory: str) -> str:
+        """Keeps the current ledger under a temporary name, so it can become generation 1 after the rename.
+        Returns None if no generations are kept or there is no ledger yet.
+        """
+        if self.__generations == 0 or not os.path.exists(self.__excel_filename):
+            return None
+        fd, previous_filename = tempfile.mkstemp(suffix=".xlsx", prefix=".previous-", dir=directory)
+        os.close(fd)
+        # hard linking keeps the current ledger in place until the new one is renamed over it
+        try:
+            os.remove(previous_filename)
+            os.link(self.__excel_filename, previous_filename)
+        except OSError:
+            shutil.copy2(self.__excel_filename, previous_filename)
+        return previous_filename
+
+    # _rotate_generations
+    def _rotate_generations(self, previous_filename: str):
+        """Shifts the kept generations by one and keeps the previous ledger as generation 1.
+
+        Args:
+            previous_filename (str): Copy of the ledger from before the save, see _link_previous.
+        """
+        if previous_filename is None:
+            return
+        # dropping the oldest and shifting the rest, e.g. 2 -> 3, 1 -> 2
+        oldest = self._generation_filename(self.__generations)
+        if os.path.exists(oldest):
+            os.remove(oldest)
+        for i in range(self.__generations - 1, 0, -1):
+            name = self._generation_filename(i)
+            if os.path.exists(name):
+                os.replace(name, self._generation_filename(i + 1))
+        os.replace(previous_filename, self._generation_filename(1))
+
     # indexing
     def indexing(self, workbook: Workbook, start_index: int) -> []:
         """Index an Excel file, from the starting index to the last value where a new digit is added.
@@ -172,21 +695,22 @@ class ExcelHandler:
         Args:
             start_index (int): Index to start indexing from.
         """
+        return list(self.iter_indexing(start_index=start_index))
+
+    # iter_indexing
+    def iter_indexing(self, start_index: int):
+        """Same as indexing, but yields the rows one at a time instead of building the whole list.
+        Can be handed straight to ExportHandler.export.
+
+        Args:
+            start_index (int): Index to start indexing from.
+        """
+        assert type(start_index) == int and start_index >= 0, "start_index needs to be a non-negative int"
         if self.__logger.verbose:
             self.__logger.write(f"[EXCEL HANDLER] start_index={start_index}\n")
-        # adding indexing to the file
-        ws = workbook.active
-        # divideing the index by 10 until the value becomes less that zero, it will provide the number of digits
-        digits = 0
-        temp = start_index
-        while(temp > 1):
-            temp /= 10
-            digits += 1
-        closing_index = ['9' for i in range(0, digits)]
-        closing_index = "".join(closing_index)
+        # the last index with as many digits as start_index, at least 99 so that small indexes get a full range
+        closing_index = max(99, 10 ** len(str(start_index)) - 1)
         if self.__logger.verbose:
             self.__logger.write(f"[EXCEL HANDLER] closing_index={closing_index}\n")
-        data = []
-        for i in range(start_index, int(closing_index) + 1):
-            data.append([i])
-        return data
+        for i in range(start_index, closing_index + 1):
+            yield [i]
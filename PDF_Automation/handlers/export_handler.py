@@ -0,0 +1,135 @@
+
+# This file contains the ExportHandler class
+
+# IMPORTS!
+import csv
+import os
+import openpyxl
+
+class ExportHandler:
+    """This class is responsible for streaming rows such as search results and generated index ranges to
+    xlsx, csv or parquet files. Rows are written as they arrive, so memory stays constant no matter how many there are.
+    """
+
+    __logger = None                                             # Logger object
+    __batch_size: int = 50_000                                  # Number of rows buffered per parquet row group
+    _formats_list = ['xlsx', 'csv', 'parquet']                  # A list containing all supported export formats
+    headers = ["ORDER_DETAILS", "DATE", "TIME", "USER"]         # Headers of the ledger columns
+    skipped: int = 0                                            # Rows the last export had to leave out, see _write_parquet
+
+    # constructor
+    def __init__(self, logger: None, batch_size: int = 50_000) -> None:
+        """Initialize an ExportHandler instance.
+        """
+        # Validating batch_size
+        assert type(batch_size) == int, "batch_size needs to be int"
+        assert batch_size > 0, "batch_size needs to be greater than zero"
+
+        # initializing
+        self.__logger = logger
+        self.__batch_size = batch_size
+
+    # export
+    def export(self, rows, filename: str, headers: list = None, _format: str = None) -> int:
+        """Writes the rows to the given file.
+
+        Args:
+            rows (iterable): Any iterable of rows, e.g. a generator from ExcelHandler.iter_search.
+            filename (str): Name of the file to write.
+            headers (list): Headers to write on top of the rows, defaults to the ledger headers.
+            _format (str): It can be either ["xlsx", "csv", "parquet"], guessed from the extension if not given.
+
+        Returns:
+            int: Number of rows written, the rows that had to be left out are counted in skipped.
+        """
+        # validating filename
+        assert type(filename) == str, "filename needs to be string"
+        assert filename != "", "filename cannot be none"
+
+        if headers is None:
+            headers = self.headers
+        if _format is None:
+            _format = os.path.splitext(filename)[1].lstrip('.').lower()
+        assert _format in self._formats_list, f"_format needs to be one of {self._formats_list}"
+
+        if self.__logger is not None and self.__logger.verbose:
+            self.__logger.write(f"[EXPORT_HANDLER] filename={filename}, format={_format}\n")
+
+        self.skipped = 0
+        if _format == 'xlsx':
+            count = self._write_xlsx(rows, filename, headers)
+        elif _format == 'csv':
+            count = self._write_csv(rows, filename, headers)
+        elif _format == 'parquet':
+            count = self._write_parquet(rows, filename, headers)
+
+        if self.__logger is not None and self.__logger.verbose:
+            self.__logger.write(f"[EXPORT_HANDLER] rows_written={count}\n")
+        if self.__logger is not None and self.skipped:
+            self.__logger.write(f"[EXPORT_HANDLER] {self.skipped} row(s) left out of {filename}\n")
+        return count
+
+    # _write_xlsx
+    def _write_xlsx(self, rows, filename: str, headers: list) -> int:
+        """Writes the rows using openpyxl write only mode, which streams them to the disk.
+        """
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet(title="Order_Details")
+        ws.append(headers)
+        count = 0
+        for row in rows:
+            ws.append(list(row))
+            count += 1
+        wb.save(filename)
+        return count
+
+    # _write_csv
+    def _write_csv(self, rows, filename: str, headers: list) -> int:
+        """Writes the rows as a csv file.
+        """
+        count = 0
+        with open(filename, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(headers)
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        return count
+
+    # _write_parquet
+    def _write_parquet(self, rows, filename: str, headers: list) -> int:
+        """Writes the rows as a parquet file, one row group per batch. Needs pyarrow to be installed.
+        Rows whose order number isn't an integer, e.g. a hand edited ABC-1, are left out and counted in skipped,
+        the same as ParquetArchive does.
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Exporting to parquet needs pyarrow, install it with 'pip install pyarrow'")
+
+        # order numbers are integers, the rest of the ledger columns are text
+        fields = [pa.field(headers[0], pa.int64())] + [pa.field(name, pa.string()) for name in headers[1:]]
+        schema = pa.schema(fields)
+        count = 0
+        with pq.ParquetWriter(filename, schema) as writer:
+            batch = [[] for _ in headers]
+            for row in rows:
+                try:
+                    order_number = int(row[0]) if row and row[0] is not None else None
+                    if order_number is not None and not -(1 << 63) <= order_number < (1 << 63):
+                        raise OverflowError(f"order number {order_number} doesn't fit in int64")
+                except (TypeError, ValueError, OverflowError):
+                    self.skipped += 1
+                    continue
+                batch[0].append(order_number)
+                for i in range(1, len(headers)):
+                    value = row[i] if i < len(row) else None
+                    batch[i].append(str(value) if value is not None else None)
+                count += 1
+                if len(batch[0]) >= self.__batch_size:
+                    writer.write_table(pa.Table.from_arrays(batch, schema=schema))
+                    batch = [[] for _ in headers]
+            if batch[0]:
+                writer.write_table(pa.Table.from_arrays(batch, schema=schema))
+        return count
@@ -0,0 +1,255 @@
+
+# This file contains the FederatedSearch class
+
+# IMPORTS!
+import json
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import openpyxl
+
+# _search_ledger
+def _search_ledger(filename: str, _type: str, search_value: str, limit: int, collect_metadata: bool):
+    """Searches one ledger, runs in a worker process of FederatedSearch.
+
+    Returns:
+        tuple: (filename, rows, metadata), metadata is None unless collect_metadata and the whole file has been read.
+    """
+    from .excel_handler import ExcelHandler
+
+    rows = []
+    min_order = max_order = min_date = max_date = None
+    users = set()
+    parsed_dates = {}
+    complete = True
+    # taken before reading, so a file changing while it is read gets its metadata collected again next time
+    stat = os.stat(filename)
+    wb = openpyxl.load_workbook(filename=filename, read_only=True)
+    try:
+        for row in wb.active.iter_rows(min_row=2, values_only=True):
+            # skipping empty rows, just in case
+            if not row or not row[0]:
+                continue
+            if ExcelHandler._matches(row, _type, search_value):
+                rows.append(row)
+                if limit is not None and len(rows) >= limit and not collect_metadata:
+                    complete = False
+                    break
+            if collect_metadata:
+                try:
+                    order_number = int(row[0])
+                except (TypeError, ValueError):
+                    order_number = None
+                if order_number is not None:
+                    min_order = order_number if min_order is None else min(min_order, order_number)
+                    max_order = order_number if max_order is None else max(max_order, order_number)
+                date = row[1] if len(row) > 1 else None
+                if date:
+                    ordinal = parsed_dates.get(date)
+                    if ordinal is None:
+                        try:
+                            ordinal = datetime.strptime(str(date), FederatedSearch.date_format).toordinal()
+                        except ValueError:
+                            ordinal = -1
+                        parsed_dates[date] = ordinal
+                    if ordinal >= 0:
+                        min_date = ordinal if min_date is None else min(min_date, ordinal)
+                        max_date = ordinal if max_date is None else max(max_date, ordinal)
+                user = row[3] if len(row) > 3 else None
+                if user and users is not None:
+                    users.add(str(user))
+                    # too many distinct users to be worth keeping, the file can't be skipped on users then
+                    if len(users) > FederatedSearch.max_users:
+                        users = None
+    finally:
+        wb.close()
+
+    if limit is not None:
+        rows = rows[:limit]
+    metadata = None
+    if collect_metadata and complete:
+        metadata = {
+            "min_order": min_order,
+            "max_order": max_order,
+            "min_date": min_date,
+            "max_date": max_date,
+            "users": sorted(users) if users is not None else None,
+            "mtime": stat.st_mtime,
+            "size": stat.st_size,
+        }
+    return filename, rows, metadata
+
+
+class FederatedSearch:
+    """Searches a set of ledger workbooks at once, e.g. yearly archives and per site ledgers.
+
+    Every file is searched in its own worker process, and results are yielded per file as soon as it finishes.
+    The min and max order number and date, and the usernames, of every file are kept in a metadata file,
+    so that files which can't contain a match aren't opened at all. The metadata of a file is refreshed
+    whenever the file changes. Searches can run on several threads at once, e.g. the GUI search and an export.
+    """
+
+    date_format: str = "%d-%m-%Y"               # Format of the DATE column, e.g. 19-01-2026
+    max_users: int = 1000                       # Most distinct usernames kept in the metadata of a file
+    __filenames: list = None                    # Ledger files to search
+    __metadata_filename: str = None             # JSON file the metadata of the ledgers is kept in
+    __workers: int = None                       # Number of worker processes
+    __executor: ProcessPoolExecutor = None      # Worker processes, started on the first search
+    __logger = None                             # Logger object
+
+    # constructor
+    def __init__(self, filenames: list, metadata_filename: str = None, workers: int = None, logger=None) -> None:
+        """Initialize a FederatedSearch instance.
+
+        Args:
+            filenames (list): Ledger files to search.
+            metadata_filename (str): JSON file to keep the metadata of the ledgers in, kept in memory only if None.
+            workers (int): Number of worker processes, defaults to the number of CPUs.
+        """
+        # Validations!
+        assert type(filenames) == list, "filenames needs to be a list"
+        assert filenames, "filenames cannot be empty"
+
+        # initializing
+        self.__filenames = list(filenames)
+        self.__metadata_filename = metadata_filename
+        self.__workers = workers
+        self.__logger = logger
+        self.__metadata = {}
+        self.__lock = threading.Lock()              # guards the metadata, its file and starting the worker processes
+        if metadata_filename is not None and os.path.exists(metadata_filename):
+            with open(metadata_filename, 'r', encoding='utf-8') as file:
+                self.__metadata = json.load(file)
+
+    # filenames
+    @property
+    def filenames(self) -> list:
+        return list(self.__filenames)
+
+    # close
+    def close(self):
+        """Stops the worker processes.
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+    # search
+    def search(self, _type: str, search_value: str, max_results: int = None):
+        """Yields (filename, rows) for every file as soon as it has been searched, in the order they finish.
+        Stops once max_results rows have been yielded in total.
+
+        Args:
+            _type (str): It can be either ["order", "date", "user"]
+            search_value (str): Value to search for.
+            max_results (int): Total number of rows to stop at, no limit if None.
+        """
+        if max_results is not None and max_results <= 0:
+            return
+        with self.__lock:
+            if self.__executor is None:
+                self.__executor = ProcessPoolExecutor(max_workers=self.__workers)
+            executor = self.__executor
+
+        futures = []
+        for filename in self.__filenames:
+            if not os.path.exists(filename):
+                self._log(f"[FEDERATED_SEARCH] skipping missing {filename}\n")
+                continue
+            metadata = self._current_metadata(filename)
+            if metadata is not None and not self._can_match(metadata, _type, search_value):
+                continue
+            futures.append(executor.submit(
+                _search_ledger, filename, _type, search_value, max_results, metadata is None
+            ))
+
+        found = 0
+        metadata_changed = False
+        try:
+            for future in as_completed(futures):
+                filename, rows, metadata = future.result()
+                if metadata is not None:
+                    with self.__lock:
+                        self.__metadata[os.path.abspath(filename)] = metadata
+                    metadata_changed = True
+                if max_results is not None:
+                    rows = rows[:max_results - found]
+                found += len(rows)
+                if rows:
+                    yield filename, rows
+                if max_results is not None and found >= max_results:
+                    break
+        finally:
+            # files that haven't been started yet aren't needed anymore
+            for future in futures:
+                future.cancel()
+            if metadata_changed:
+                self._save_metadata()
+
+    # _current_metadata
+    def _current_metadata(self, filename: str):
+        """Returns:
+            _type_: None if the file has changed since its metadata was collected else the metadata.
+        """
+        with self.__lock:
+            metadata = self.__metadata.get(os.path.abspath(filename))
+        if metadata is None:
+            return None
+        stat = os.stat(filename)
+        if metadata.get("mtime") != stat.st_mtime or metadata.get("size") != stat.st_size:
+            return None
+        return metadata
+
+    # _can_match
+    def _can_match(self, metadata: dict, _type: str, search_value: str) -> bool:
+        """Checks whether a file with the given metadata can contain a match at all.
+        """
+        if _type == "order":
+            try:
+                order_number = int(search_value)
+            except ValueError:
+                # only numeric order numbers are tracked, can't tell for anything else
+                return True
+            if metadata["min_order"] is None:
+                return False
+            return metadata["min_order"] <= order_number <= metadata["max_order"]
+        elif _type == "date":
+            try:
+                ordinal = datetime.strptime(search_value, self.date_format).toordinal()
+            except ValueError:
+                # the ledger compares dates as text, anything that isn't a date can't match
+                return False
+            if metadata["min_date"] is None:
+                return False
+            return metadata["min_date"] <= ordinal <= metadata["max_date"]
+        elif _type == "user":
+            if metadata["users"] is None:
+                return True
+            value = search_value.lower()
+            return any(value in user.lower() for user in metadata["users"])
+        return True
+
+    # _save_metadata
+    def _save_metadata(self):
+        if self.__metadata_filename is None:
+            return
+        directory = os.path.dirname(os.path.abspath(self.__metadata_filename))
+        # held while writing too, so an older copy of the metadata can't be renamed over a newer one
+        with self.__lock:
+            fd, temp_filename = tempfile.mkstemp(prefix=".metadata-", dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                    json.dump(self.__metadata, file)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_filename, self.__metadata_filename)
+            finally:
+                if os.path.exists(temp_filename):
+                    os.remove(temp_filename)
+
+    # _log
+    def _log(self, message: str):
+        if self.__logger is not None and self.__logger.verbose:
+            self.__logger.write(message)
@@ -1,6 +1,8 @@
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
 import os
+import queue
+import threading
 from PIL import Image, ImageTk
 import openpyxl
 from datetime import datetime
@@ -9,9 +11,19 @@ class GUI(tk.Tk):
     """Contains the frontend components of the PDFAutomation.
     """
     excel_handler = None
+    checkpoint_handler = None
+    logger = None
+    page_timeout = None                 # Time budget of one PDF page, pages are extracted in isolation if set
+    page_memory_mb = 512                # Memory budget of the page extraction worker
+    service_client = None               # ServiceClient of a LedgerService, the GUI is a thin client if set
+    federated_search = None             # FederatedSearch over several ledgers, searches all of them if set
+    max_results = None                  # Number of federated search results to stop at, no limit if None
+    service_executor = None             # Worker threads the ServiceClient calls run on, created on first use
 
     # constructor
-    def __init__(self, png: str, ico: str, excel_handler):
+    def __init__(self, png: str, ico: str, excel_handler, checkpoint_handler=None, logger=None,
+                 page_timeout: float = None, page_memory_mb: int = 512, service_client=None,
+                 federated_search=None, max_results: int = None):
         super().__init__()
         
         # Windows taskbar + task manager icon
@@ -21,6 +33,13 @@ class GUI(tk.Tk):
             pass  # fallback below
         
         self.excel_handler = excel_handler
+        self.checkpoint_handler = checkpoint_handler
+        self.logger = logger
+        self.page_timeout = page_timeout
+        self.page_memory_mb = page_memory_mb
+        self.service_client = service_client
+        self.federated_search = federated_search
+        self.max_results = max_results
 
         # Extra fallback (Windows sometimes needs this)
         icon_img = Image.open(png)
@@ -94,12 +113,12 @@ class GUI(tk.Tk):
         browse_btn.pack(side="right")
 
         # Process button
-        process_btn = ttk.Button(
+        self.process_btn = ttk.Button(
             self,
             text="Process PDF",
             command=self.process_pdf
         )
-        process_btn.pack(pady=15)
+        self.process_btn.pack(pady=15)
 
         # Status
         self.status_label = ttk.Label(
@@ -183,6 +202,13 @@ class GUI(tk.Tk):
         )
         search_btn.pack(side="right")
 
+        stats_btn = ttk.Button(
+            input_frame,
+            text="Statistics",
+            command=self.show_statistics
+        )
+        stats_btn.pack(side="right", padx=(0, 10))
+
         # Search hint
         self.search_hint = ttk.Label(
             self,
@@ -216,29 +242,146 @@ class GUI(tk.Tk):
             return
 
         try:
-            from .excel_handler import ExcelHandler
-            search_for_order = ExcelHandler(filename="boltworld.xlsx")
             # getting selected search type
             search_type = self.search_type.get()
-            # calling the excel_handler search
-            results = search_for_order.search(_type=search_type, search_value=search_value, excel_filename="boltworld.xlsx")
-            # Display results
-            if results[0] == 100:
-                self._display_search_results(results, search_value, search_type)
-            elif results[0] == 103:     # means that no orders are found
-                messagebox.showinfo(
-                    "No Results",
-                    f"No orders found matching '{search_value}'"
+            # searching every ledger, the results window fills in as the ledgers are searched
+            if self.federated_search is not None:
+                self._stream_search_results(search_value, search_type)
+                return
+            # calling the service search if there is one, it answers from its warm index
+            if self.service_client is not None:
+                self._run_in_background(
+                    lambda: self.service_client.search(_type=search_type, search_value=search_value),
+                    lambda done: self._show_search_outcome(done.result(), search_value, search_type)
                 )
+                return
+            # calling the excel_handler search
+            results = self.excel_handler.search(_type=search_type, search_value=search_value, excel_filename="boltworld.xlsx")
+            self._show_search_outcome(results, search_value, search_type)
 
         except Exception as e:
-            messagebox.showerror(
-                "Search Error",
-                f"An error occurred while searching:\n\n{str(e)}"
+            self._show_search_error(e)
+
+    # _show_search_outcome
+    def _show_search_outcome(self, results, search_value, search_type):
+        """Displays the results of a search, or why there aren't any"""
+        if results[0] == 100:
+            self._display_search_results(results, search_value, search_type)
+        elif results[0] == 103:     # means that no orders are found
+            messagebox.showinfo(
+                "No Results",
+                f"No orders found matching '{search_value}'"
+            )
+        elif results[0] == 102 and self.service_client is not None:     # the service has no ledger yet
+            messagebox.showinfo(
+                "No Data",
+                "The Excel file doesn't exist yet.\nProcess a PDF first to create the database."
             )
 
+    # _show_search_error
+    def _show_search_error(self, e: Exception):
+        messagebox.showerror(
+            "Search Error",
+            f"An error occurred while searching:\n\n{str(e)}"
+        )
+
+    # _run_in_background
+    def _run_in_background(self, call, on_done, on_error=None):
+        """Runs call on a worker thread, so that a slow or hung service can't freeze the window, then hands
+        the finished Future to on_done on the Tk thread. Exceptions go to on_error, _show_search_error by default"""
+        from concurrent.futures import ThreadPoolExecutor
+        if self.service_executor is None:
+            self.service_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="service-client")
+        self._wait_for_background(self.service_executor.submit(call), on_done, on_error or self._show_search_error)
+
+    # _wait_for_background
+    def _wait_for_background(self, future, on_done, on_error):
+        """Polls a call started by _run_in_background"""
+        if not future.done():
+            self.after(100, lambda: self._wait_for_background(future, on_done, on_error))
+            return
+        try:
+            on_done(future)
+        except Exception as e:
+            on_error(e)
+
     def _display_search_results(self, results, search_term, search_type):
         """Display search results in a new window"""
+        result_window, header, tree = self._build_results_window(
+            f"Found {len(results[1])} result(s) for '{search_term}'", search_term, search_type
+        )
+
+        # Insert data
+        for row in results[1]:
+            tree.insert("", "end", values=row)
+
+    # _stream_search_results
+    def _stream_search_results(self, search_term, search_type):
+        """Opens the results window right away and adds the results of every ledger as soon as it has been searched"""
+        total = len(self.federated_search.filenames)
+        result_window, header, tree = self._build_results_window(
+            f"Searching {total} ledger(s) for '{search_term}'...", search_term, search_type
+        )
+
+        results = queue.Queue()
+        stop = threading.Event()
+
+        def search():
+            try:
+                for filename, rows in self.federated_search.search(search_type, search_term, max_results=self.max_results):
+                    results.put((filename, rows))
+                    # closing the window stops the search, ledgers that haven't been started are skipped
+                    if stop.is_set():
+                        break
+                results.put((None, None))
+            except Exception as e:
+                results.put((None, e))
+
+        result_window.bind("<Destroy>", lambda e: stop.set() if e.widget is result_window else None)
+        threading.Thread(target=search, name="federated-search", daemon=True).start()
+        self._poll_search_results(result_window, header, tree, results, search_term, [0, 0])
+
+    # _poll_search_results
+    def _poll_search_results(self, result_window, header, tree, results, search_term, counts: list):
+        """Moves the results found so far into the results window, counts is [ledgers with results, rows]"""
+        if not result_window.winfo_exists():
+            return
+
+        while True:
+            try:
+                filename, rows = results.get_nowait()
+            except queue.Empty:
+                self.after(100, lambda: self._poll_search_results(result_window, header, tree, results, search_term, counts))
+                return
+            if filename is None:
+                break
+            counts[0] += 1
+            counts[1] += len(rows)
+            for row in rows:
+                tree.insert("", "end", values=row)
+            header.config(text=f"Found {counts[1]} result(s) for '{search_term}' so far, in {counts[0]} ledger(s)")
+
+        # finished, rows is the exception if the search failed
+        if isinstance(rows, Exception):
+            header.config(text=f"Found {counts[1]} result(s) for '{search_term}', the search failed")
+            messagebox.showerror(
+                "Search Error",
+                f"An error occurred while searching:\n\n{str(rows)}",
+                parent=result_window
+            )
+            return
+        text = f"Found {counts[1]} result(s) for '{search_term}' in {counts[0]} ledger(s)"
+        if self.max_results is not None and counts[1] >= self.max_results:
+            text += f", showing the first {self.max_results}"
+        header.config(text=text)
+
+    # _build_results_window
+    def _build_results_window(self, header_text, search_term, search_type):
+        """Builds the search results window
+
+        Returns:
+            tuple: (result_window, header, tree)
+        """
         result_window = tk.Toplevel(self)
         result_window.title("Search Results")
         result_window.geometry("650x450")
@@ -246,7 +389,6 @@ class GUI(tk.Tk):
         result_window.grab_set()
 
         # Header
-        header_text = f"Found {len(results[1])} result(s) for '{search_term}'"
         header = ttk.Label(
             result_window,
             text=header_text,
@@ -290,18 +432,33 @@ class GUI(tk.Tk):
         tree.column("Time", width=120, anchor="center")
         tree.column("User", width=150, anchor="center")
 
-        # Insert data
-        for row in results[1]:
-            tree.insert("", "end", values=row)
-
         tree.pack(fill="both", expand=True)
 
-        # Close button
+        # Export and Close buttons
         action_frame = tk.Frame(result_window)
         action_frame.pack(fill="x", pady=(8, 14))
 
+        buttons_frame = tk.Frame(action_frame)
+        buttons_frame.pack()
+
+        export_btn = tk.Button(
+            buttons_frame,
+            text="Export",
+            command=lambda: self._export_search_results(result_window, search_type, search_term),
+            font=("Segoe UI", 11, "bold"),
+            bg="#e5e7eb",
+            fg="#111827",
+            activebackground="#d1d5db",
+            activeforeground="#111827",
+            relief="flat",
+            padx=40,
+            pady=12,
+            cursor="hand2"
+        )
+        export_btn.pack(side="left", padx=(0, 10))
+
         close_btn = tk.Button(
-            action_frame,
+            buttons_frame,
             text="Close",
             command=result_window.destroy,
             font=("Segoe UI", 11, "bold"),
@@ -314,10 +471,222 @@ class GUI(tk.Tk):
             pady=12,
             cursor="hand2"
         )
-        close_btn.pack()
+        close_btn.pack(side="left")
 
         result_window.bind("<Escape>", lambda e: result_window.destroy())
 
+        return result_window, header, tree
+
+    # show_statistics
+    def show_statistics(self):
+        """Display order counts per date, per user and per date and user, read from the rollups"""
+        if self.service_client is not None:
+            # a thin client shows the statistics of the service's ledger, asked for on a worker thread
+            self._run_in_background(self.service_client.stats, self._show_service_statistics, self._show_statistics_error)
+            return
+
+        rollups = self.excel_handler.get_rollups()
+        if rollups is None:
+            messagebox.showinfo(
+                "No Statistics",
+                "Order statistics are not enabled.\nSet ROLLUP_FILE to keep them alongside the Excel file."
+            )
+            return
+        self._show_statistics_window(
+            lambda: (rollups.per_date(), rollups.per_user(), rollups.per_date_user()),
+            rebuild=self.excel_handler.rebuild_rollups
+        )
+
+    # _show_service_statistics
+    def _show_service_statistics(self, done):
+        stats = done.result()
+        if not stats["enabled"]:
+            messagebox.showinfo(
+                "No Statistics",
+                "Order statistics are not enabled on the service.\nSet ROLLUP_FILE for it to keep them alongside the Excel file."
+            )
+            return
+        # rebuilding is done on the service host, with --rebuild-rollups
+        self._show_statistics_window(lambda: (stats["per_date"], stats["per_user"], stats["per_date_user"]), rebuild=None)
+
+    # _show_statistics_error
+    def _show_statistics_error(self, e: Exception):
+        messagebox.showerror(
+            "Statistics Error",
+            f"An error occurred while reading the statistics:\n\n{str(e)}"
+        )
+
+    # _show_statistics_window
+    def _show_statistics_window(self, load, rebuild=None):
+        """Opens the statistics window, load returns the rows of the three tabs, rebuild recounts them if given"""
+        stats_window = tk.Toplevel(self)
+        stats_window.title("Order Statistics")
+        stats_window.geometry("650x450")
+        stats_window.resizable(True, True)
+        stats_window.grab_set()
+
+        # Header
+        header = ttk.Label(
+            stats_window,
+            text="Order Statistics",
+            font=("Segoe UI", 12, "bold")
+        )
+        header.pack(pady=(15, 10))
+
+        # One tab per rollup
+        notebook = ttk.Notebook(stats_window)
+        notebook.pack(fill="both", expand=True, padx=15, pady=5)
+
+        tabs = [
+            ("Per Day", ("Date", "Orders")),
+            ("Per User", ("User", "Orders")),
+            ("Per Day and User", ("Date", "User", "Orders")),
+        ]
+        trees = []
+        for title, columns in tabs:
+            tab = ttk.Frame(notebook)
+            notebook.add(tab, text=title)
+
+            y_scroll = ttk.Scrollbar(tab)
+            y_scroll.pack(side="right", fill="y")
+
+            tree = ttk.Treeview(
+                tab,
+                columns=columns,
+                show="headings",
+                yscrollcommand=y_scroll.set,
+                height=12
+            )
+            y_scroll.config(command=tree.yview)
+            for column in columns:
+                tree.heading(column, text=column)
+                tree.column(column, width=150, anchor="center")
+            tree.pack(fill="both", expand=True)
+            trees.append(tree)
+
+        def fill():
+            for tree, rows in zip(trees, load()):
+                tree.delete(*tree.get_children())
+                for row in rows:
+                    tree.insert("", "end", values=row)
+
+        def rebuild_and_fill():
+            try:
+                rebuild()
+            except Exception as e:
+                messagebox.showerror(
+                    "Rebuild Error",
+                    f"An error occurred while rebuilding the statistics:\n\n{str(e)}",
+                    parent=stats_window
+                )
+                return
+            fill()
+
+        fill()
+
+        # Rebuild and Close buttons
+        action_frame = tk.Frame(stats_window)
+        action_frame.pack(fill="x", pady=(8, 14))
+
+        buttons_frame = tk.Frame(action_frame)
+        buttons_frame.pack()
+
+        rebuild_btn = tk.Button(
+            buttons_frame,
+            text="Rebuild",
+            command=rebuild_and_fill,
+            font=("Segoe UI", 11, "bold"),
+            bg="#e5e7eb",
+            fg="#111827",
+            activebackground="#d1d5db",
+            activeforeground="#111827",
+            relief="flat",
+            padx=40,
+            pady=12,
+            cursor="hand2"
+        )
+        if rebuild is not None:
+            rebuild_btn.pack(side="left", padx=(0, 10))
+
+        close_btn = tk.Button(
+            buttons_frame,
+            text="Close",
+            command=stats_window.destroy,
+            font=("Segoe UI", 11, "bold"),
+            bg="#2563eb",
+            fg="white",
+            activebackground="#1e40af",
+            activeforeground="white",
+            relief="flat",
+            padx=50,
+            pady=12,
+            cursor="hand2"
+        )
+        close_btn.pack(side="left")
+
+        stats_window.bind("<Escape>", lambda e: stats_window.destroy())
+
+    # _export_search_results
+    def _export_search_results(self, parent, search_type: str, search_term: str):
+        """Asks for a file and streams the search results to it on a background thread"""
+        filename = filedialog.asksaveasfilename(
+            parent=parent,
+            title="Export Search Results",
+            defaultextension=".xlsx",
+            filetypes=[("Excel Files", "*.xlsx"), ("CSV Files", "*.csv"), ("Parquet Files", "*.parquet")]
+        )
+        if not filename:
+            return
+
+        from concurrent.futures import ThreadPoolExecutor
+        from .export_handler import ExportHandler
+        export_handler = ExportHandler(logger=None)
+        if self.federated_search is not None:
+            # rows of every ledger, in the order the ledgers finish
+            rows = (
+                row for _, ledger_rows in self.federated_search.search(search_type, search_term, max_results=self.max_results)
+                for row in ledger_rows
+            )
+        elif self.service_client is not None:
+            # the service answers from its index, the rows come back in one response, requested on the export thread
+            def service_rows():
+                yield from self.service_client.search(_type=search_type, search_value=search_term)[1]
+            rows = service_rows()
+        else:
+            # the search is run again as a generator, so the rows go straight from the ledger to the export file
+            rows = self.excel_handler.iter_search(_type=search_type, search_value=search_term)
+        executor = ThreadPoolExecutor(max_workers=1)
+        export = executor.submit(export_handler.export, rows, filename)
+        executor.shutdown(wait=False)
+        self._wait_for_export(parent, export, filename, export_handler)
+
+    # _wait_for_export
+    def _wait_for_export(self, parent, export, filename: str, export_handler):
+        """Polls a background export and reports the outcome once it has finished"""
+        if not export.done():
+            self.after(100, lambda: self._wait_for_export(parent, export, filename, export_handler))
+            return
+
+        try:
+            count = export.result()
+        except Exception as e:
+            messagebox.showerror(
+                "Export Error",
+                f"An error occurred while exporting:\n\n{str(e)}",
+                parent=parent
+            )
+            return
+
+        message = f"{count} row(s) have been written to {os.path.basename(filename)}"
+        if export_handler.skipped:
+            # parquet files keep order numbers as integers, hand edited ones like ABC-1 don't fit
+            message += f"\n\n{export_handler.skipped} row(s) without a numeric order number were left out"
+        messagebox.showinfo(
+            "Export Complete",
+            message,
+            parent=parent
+        )
+
     # browse_file
     def browse_file(self):
         file = filedialog.askopenfilename(
@@ -348,43 +717,190 @@ class GUI(tk.Tk):
             )
             self.update_idletasks()
 
+            if self.service_client is not None:
+                # the service extracts the pdf and writes the ledger, only waiting for it here
+                filename = self.pdf_path.get()
+                self.process_btn.state(["disabled"])
+                self._run_in_background(lambda: self.service_client.submit(filename), self._job_submitted,
+                                        self._show_service_error)
+                return
+
+            from concurrent.futures import ThreadPoolExecutor
             from ..pdfa import PDFAutomation, PDFHandler
             # BAKCEND LINKAGE POINT
             pdf_automation = PDFAutomation()
             # PDF Handler
-            pdf_handler = PDFHandler(filename=self.pdf_path.get())
-            status_code = pdf_automation.initialize(pdf_handler=pdf_handler, excel_handler=self.excel_handler)
-
-            if status_code == 101:
-                # it means that the user didn't closed the file, and still clicked OK
-                # promts the user that changes havn't been saved in this case,
-                self.pdf_path.set("")
-                self.status_label.config(
-                    text=f"Changes Not Saved! You need to process pdf again after closing Excel file.",
-                    foreground='#821f04'
-                )
-            else:
-                # Reset UI after success
-                self.pdf_path.set("")
-                self.status_label.config(
-                    text="PDF processed successfully ✓",
-                    foreground="#1a7f37"
-                )
+            pdf_handler = PDFHandler(filename=self.pdf_path.get(), logger=self.logger)
+            # extracting and writing on a worker thread and saving on a background thread, so the window keeps
+            # responding meanwhile, also while a bad page uses up its time budget. One pdf at a time though
+            self.process_btn.state(["disabled"])
+            executor = ThreadPoolExecutor(max_workers=1)
+            processing = executor.submit(
+                pdf_automation.initialize, pdf_handler=pdf_handler, excel_handler=self.excel_handler, background_save=True,
+                checkpoint=self.checkpoint_handler, page_timeout=self.page_timeout, page_memory_mb=self.page_memory_mb,
+                show_duplicates=False
+            )
+            executor.shutdown(wait=False)
+            self._wait_for_processing(processing, pdf_automation, pdf_handler)
 
-                messagebox.showinfo(
-                    "Success",
-                    "Order details have been written to boltworld.xlsx"
-                )
+        except Exception as e:
+            self.process_btn.state(["!disabled"])
+            self._show_processing_error(e)
+
+    # _wait_for_processing
+    def _wait_for_processing(self, processing, pdf_automation, pdf_handler):
+        """Polls the extraction of a pdf running on a worker thread, then waits for its background save"""
+        if not processing.done():
+            self.after(100, lambda: self._wait_for_processing(processing, pdf_automation, pdf_handler))
+            return
 
+        try:
+            save = processing.result()
         except Exception as e:
+            self.process_btn.state(["!disabled"])
+            self._show_processing_error(e)
+            return
+
+        self.status_label.config(
+            text="Saving to boltworld.xlsx...",
+            foreground="#333333"
+        )
+        # windows can only be opened from the Tk thread
+        if pdf_automation.duplicate_orders:
+            GUI.show_duplicate_orders(pdf_automation.duplicate_orders)
+        self._wait_for_save(save, pdf_handler)
+
+    # _job_submitted
+    def _job_submitted(self, done):
+        """Starts waiting for a job once the service has queued it"""
+        self.process_btn.state(["!disabled"])
+        job_id = done.result()
+        self.status_label.config(
+            text=f"Queued as job {job_id}...",
+            foreground="#333333"
+        )
+        self._wait_for_job(job_id)
+
+    # _show_service_error
+    def _show_service_error(self, e: Exception):
+        self.process_btn.state(["!disabled"])
+        self._show_processing_error(e)
+
+    # _wait_for_job
+    def _wait_for_job(self, job_id: int):
+        """Polls a job submitted to the service and reports the outcome once it has been committed or given up on"""
+        self._run_in_background(lambda: self._job_status(job_id), lambda done: self._show_job_status(job_id, *done.result()),
+                                self._show_processing_error)
+
+    # _job_status
+    def _job_status(self, job_id: int):
+        """Asks the service for a job, and for why it can't save the ledger if the job is waiting for that.
+        Runs on a worker thread.
+
+        Returns:
+            tuple: (job, commit_error)
+        """
+        job = self.service_client.status(job_id)
+        commit_error = None
+        if job["status"] == "done":
+            # extracted, but the service may be failing to write the ledger
+            try:
+                commit_error = self.service_client.health().get("commit_error")
+            except Exception:
+                pass
+        return job, commit_error
+
+    # _show_job_status
+    def _show_job_status(self, job_id: int, job: dict, commit_error: str):
+        if job["status"] == "dead":
+            self.pdf_path.set("")
+            self._show_processing_error(RuntimeError(f"Job {job_id} failed after {job['attempts']} attempt(s): {job['error']}"))
+        elif job["status"] == "committed":
+            self._show_success(job["flagged_pages"])
+        else:
+            text = f"Job {job_id} is {job['status']}..."
+            if commit_error:
+                text = f"Job {job_id} is waiting for the ledger, the service can't save it: {commit_error}"
             self.status_label.config(
-                text="An error occurred ✖",
-                foreground="#cc0000"
+                text=text,
+                foreground="#333333"
             )
-            messagebox.showerror(
-                "Processing Error",
-                f"Something went wrong:\n\n{str(e)}"
+            self.after(1000, lambda: self._wait_for_job(job_id))
+
+    # _wait_for_save
+    def _wait_for_save(self, save, pdf_handler):
+        """Polls a background save and reports the outcome once it has finished"""
+        if not save.done():
+            self.after(100, lambda: self._wait_for_save(save, pdf_handler))
+            return
+
+        self.process_btn.state(["!disabled"])
+        try:
+            status_code = save.result()
+        except Exception as e:
+            self._show_processing_error(e)
+            return
+
+        if status_code == 101:
+            # it means that the file is opened by some other program, so the new ledger couldn't be put in place
+            # promts the user that changes havn't been saved in this case,
+            self.pdf_path.set("")
+            self.status_label.config(
+                text=f"Changes Not Saved! You need to process pdf again after closing Excel file.",
+                foreground='#821f04'
+            )
+        elif status_code == 104:
+            # it means that the checkpoint says the orders of this pdf are already in the ledger
+            if self.checkpoint_handler is not None and messagebox.askyesno(
+                "Already Processed",
+                "Every order of this PDF is already in boltworld.xlsx.\n\nDo you want to read the PDF again anyway?"
+            ):
+                # forgetting the checkpoint, the pdf is extracted from scratch and its orders are checked again
+                self.checkpoint_handler.remove(pdf_handler.file_hash)
+                self.process_pdf()
+                return
+            self.pdf_path.set("")
+            self.status_label.config(
+                text="PDF already processed, nothing new to write.",
+                foreground="#555555"
             )
+        else:
+            self._show_success(pdf_handler.flagged_pages)
+
+    # _show_success
+    def _show_success(self, flagged_pages: list):
+        """Resets the UI after a PDF has been written to the ledger, listing the pages that had to be skipped"""
+        # Reset UI after success
+        self.pdf_path.set("")
+        self.status_label.config(
+            text="PDF processed successfully ✓",
+            foreground="#1a7f37"
+        )
+
+        if flagged_pages:
+            # pages that went over their time or memory budget have been skipped
+            skipped = "\n".join(f"Page {page + 1}: {reason}" for page, reason in flagged_pages)
+            messagebox.showwarning(
+                "Completed With Skipped Pages",
+                f"Order details have been written to boltworld.xlsx\n\n"
+                f"The following pages could not be read and were skipped:\n\n{skipped}"
+            )
+        else:
+            messagebox.showinfo(
+                "Success",
+                "Order details have been written to boltworld.xlsx"
+            )
+
+    # _show_processing_error
+    def _show_processing_error(self, e: Exception):
+        self.status_label.config(
+            text="An error occurred ✖",
+            foreground="#cc0000"
+        )
+        messagebox.showerror(
+            "Processing Error",
+            f"Something went wrong:\n\n{str(e)}"
+        )
 
     # prompt_error
     @staticmethod
@@ -1,8 +1,102 @@
 
 # Imports!
+import getpass
+import multiprocessing
+import os
 import PyPDF2 as pdf2
 import regex as re
+import time
 from datetime import datetime
+from .record_store import OrderRecordStore
+from .checkpoint_handler import CheckpointHandler
+
+# _extract_pages_worker
+def _extract_pages_worker(filename: str, start_page: int, memory_bytes: int, connection):
+    """Extracts the text of every page from start_page onwards and sends it through the connection.
+    Runs in a worker process, see PDFHandler._iter_page_texts_isolated.
+
+    Messages sent: ("start", page), then ("page", page, text) or ("error", page, reason), and ("done",) at the end.
+    """
+    if memory_bytes:
+        try:
+            import resource
+            resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+        except (ImportError, ValueError, OSError):
+            pass    # no address space limits on this platform, e.g. Windows, the parent watches the memory instead
+    reader = pdf2.PdfReader(filename, strict=False)
+    for page_number in range(start_page, len(reader.pages)):
+        connection.send(("start", page_number))
+        try:
+            text = reader.pages[page_number].extract_text()
+        except MemoryError:
+            # the process may be in a bad state after this, letting the parent start a fresh one
+            connection.send(("error", page_number, "memory budget exceeded"))
+            return
+        except Exception as e:
+            connection.send(("error", page_number, repr(e)))
+            continue
+        connection.send(("page", page_number, text))
+    connection.send(("done",))
+
+# _process_memory
+def _process_memory(pid: int) -> int:
+    """Resident memory of a process in bytes, using psutil if it is installed.
+
+    Returns:
+        int: None if it can't be read on this platform.
+    """
+    try:
+        import psutil
+    except ImportError:
+        psutil = None
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return None
+    if os.name == 'nt':
+        return _windows_process_memory(pid)
+    try:
+        with open(f"/proc/{pid}/statm", 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+# _windows_process_memory
+def _windows_process_memory(pid: int) -> int:
+    """Working set of a process in bytes, read with GetProcessMemoryInfo.
+    """
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    kernel32.OpenProcess.restype = wintypes.HANDLE
+    kernel32.K32GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    kernel32.K32GetProcessMemoryInfo.restype = wintypes.BOOL
+    kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+
+    # PROCESS_QUERY_LIMITED_INFORMATION
+    handle = kernel32.OpenProcess(0x1000, False, pid)
+    if not handle:
+        return None
+    try:
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        if not kernel32.K32GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize
+    finally:
+        kernel32.CloseHandle(handle)
 
 # PDFHandler
 class PDFHandler:
@@ -13,9 +107,14 @@ class PDFHandler:
     __pdf_name: str = None                                      # Name of the PDF
     reader = None                                         # Instance to handle pdf
     _orders_types_lists = ['web', 'ebay', 'payslips']           # A list containing all types of order names
+    file_hash: str = None                                       # SHA-256 of the PDF, set when checkpointing
+    already_committed: bool = False                             # True if a checkpoint says the orders are already in the ledger
+    flagged_pages: list = None                                  # (page_number, reason) of pages skipped in isolated mode
+    memory_check_interval: float = 0.1                          # Seconds between two checks of the worker's memory in isolated mode
+    __logger = None                                             # Logger object
 
     # constructor
-    def __init__(self, filename: str):
+    def __init__(self, filename: str, logger=None):
 
         # Validations!
         assert type(filename) == str, "filename needs to be string"
@@ -23,6 +122,8 @@ class PDFHandler:
         
         # initializing
         self.__pdf_name = filename
+        self.__logger = logger
+        self.flagged_pages = []
     
     # open
     def open(self):
@@ -34,43 +135,208 @@ class PDFHandler:
         # return self.reader
     
     # fetch_order_details
-    def fetch_order_details(self, o_type: str) -> list:
+    def fetch_order_details(self, o_type: str, compact: bool = False, checkpoint: CheckpointHandler = None,
+                            checkpoint_every: int = 50, isolated: bool = False, page_timeout: float = 30.0,
+                            page_memory_mb: int = 512, user: str = None) -> list:
         """Reads the PDF and fetch the details as specidifed by the order type.
 
         Args:
             o_type (str): Type of the order.
             It can be either ["web", "ebay", "payslips"]
+            compact (bool): If True, the details are collected in an OrderRecordStore instead of a list.
+            checkpoint (CheckpointHandler): If given, the progress is checkpointed every checkpoint_every pages,
+            and a previous run of the same PDF is resumed from its last checkpoint.
+            checkpoint_every (int): Number of pages between two checkpoints.
+            isolated (bool): If True, pages are extracted in a worker process. A page taking longer than
+            page_timeout seconds, or more than page_memory_mb of memory, is killed and added to flagged_pages,
+            and the rest of the document keeps going.
+            page_timeout (float): Time budget of one page in isolated mode.
+            page_memory_mb (int): Memory budget of the worker process in isolated mode.
+            user (str): Username the orders are credited to, defaults to the user running this process.
 
         Returns:
-            list: A list containing order details as per specified.
+            list: A list containing order details as per specified, or an OrderRecordStore if compact.
+            If the checkpoint says the orders of this PDF have already been committed, already_committed is set
+            and the committed orders are returned without reading the PDF.
         """
-        order_details = []
-        from os import getlogin
-        logged_in_user = getlogin()
+        order_details = OrderRecordStore() if compact else []
+        logged_in_user = user if user is not None else self.current_user()
 
         # validating o_type
         assert o_type != "", "o_type cannot be none"
         assert o_type in self._orders_types_lists
+        assert type(checkpoint_every) == int and checkpoint_every > 0, "checkpoint_every needs to be a positive int"
+
+        # resuming from the last checkpoint of this PDF, if any
+        start_page = 0
+        self.already_committed = False
+        self.flagged_pages = []
+        if checkpoint is not None:
+            self.file_hash = checkpoint.file_hash(self.__pdf_name)
+            state = checkpoint.load(self.file_hash)
+            if state is not None and state["o_type"] == o_type:
+                start_page = state["next_page"]
+                order_details.extend(state["orders"])
+                self.flagged_pages = [tuple(page) for page in state.get("flagged_pages", [])]
+                if state["committed"]:
+                    self.already_committed = True
+                    return order_details
+
+        if isolated:
+            pages = self._iter_page_texts_isolated(start_page, page_timeout=page_timeout, page_memory_mb=page_memory_mb)
+        else:
+            pages = self._iter_page_texts(start_page)
+
+        for page_number, content in pages:
+            order = self._extract_order(content, o_type, logged_in_user)
+            if order:
+                order_details.append(order)
+            if checkpoint is not None and (page_number + 1) % checkpoint_every == 0:
+                checkpoint.save(self.file_hash, o_type=o_type, next_page=page_number + 1, orders=order_details,
+                                flagged_pages=self.flagged_pages)
+
+        if checkpoint is not None:
+            checkpoint.save(self.file_hash, o_type=o_type, next_page=len(self.reader.pages), orders=order_details,
+                            flagged_pages=self.flagged_pages)
 
-        for page in self.reader.pages:
-            content = page.extract_text()
-            if o_type == 'web':
-                # using regex to extract order number patter
-                data = re.search(string=content, pattern='Order[ ]Number..+[0-9]')
-                if data:
-                    date = datetime.now().date().strftime("%d-%m-%Y")
-                    time = datetime.now().time().strftime("%I:%M %p")
-                    # if a matching pattern is found, append the details to the list
-                    order_details.append([data.group(0), date, time, logged_in_user])
-            elif o_type == 'ebay':
-                raise NotImplemented
-            elif o_type == 'payslips':
-                raise NotImplemented
-            
-        # splitting the list and then converting order numbers into int just to contain numbers only in integer format
-        for order in order_details:
-            order[0] = order[0].split(': ')[1]
-            order[0] = int(order[0])
-        
         return order_details
-            
+
+    # current_user
+    @staticmethod
+    def current_user() -> str:
+        """Username of the user running this process, also without a terminal, e.g. in a service.
+        """
+        try:
+            return os.getlogin()
+        except OSError:
+            return getpass.getuser()
+
+    # _iter_page_texts
+    def _iter_page_texts(self, start_page: int = 0):
+        """Yields (page_number, text) for every page from start_page onwards.
+        """
+        for page_number in range(start_page, len(self.reader.pages)):
+            yield page_number, self.reader.pages[page_number].extract_text()
+
+    # _iter_page_texts_isolated
+    def _iter_page_texts_isolated(self, start_page: int = 0, page_timeout: float = 30.0, page_memory_mb: int = 512):
+        """Same as _iter_page_texts, but the pages are extracted in a worker process with a time and memory budget.
+        Pages over budget are added to flagged_pages and skipped, and a fresh worker carries on from the next page.
+        The memory is limited inside the worker where the platform allows it, and watched from here everywhere.
+        """
+        total_pages = len(self.reader.pages)
+        memory_bytes = page_memory_mb * 1024 * 1024 if page_memory_mb else 0
+        next_page = start_page
+        restarts_without_progress = 0
+        while next_page < total_pages:
+            receiver, sender = multiprocessing.Pipe(duplex=False)
+            worker = multiprocessing.Process(
+                target=_extract_pages_worker,
+                args=(self.__pdf_name, next_page, memory_bytes, sender),
+                daemon=True
+            )
+            worker.start()
+            sender.close()
+            current_page = None
+            progressed = False
+            try:
+                while True:
+                    waited = self._wait_for_worker(receiver, worker, page_timeout, memory_bytes)
+                    if waited != "ready":
+                        if waited == "timeout":
+                            reason = f"took longer than {page_timeout} seconds"
+                        else:
+                            reason = f"went over {page_memory_mb} MB of memory"
+                        # opening the pdf isn't a page, it gets the same budget though
+                        if current_page is None:
+                            error = TimeoutError if waited == "timeout" else MemoryError
+                            raise error(f"Opening {self.__pdf_name} {reason}")
+                        self._flag_page(current_page, reason)
+                        next_page = current_page + 1
+                        progressed = True
+                        break
+                    try:
+                        message = receiver.recv()
+                    except EOFError:
+                        # the worker died, most likely by going over its memory budget
+                        worker.join()
+                        if current_page is not None:
+                            self._flag_page(current_page, f"worker exited with code {worker.exitcode}")
+                            next_page = current_page + 1
+                            progressed = True
+                        break
+                    if message[0] == "start":
+                        current_page = message[1]
+                    elif message[0] == "page":
+                        current_page = None
+                        next_page = message[1] + 1
+                        progressed = True
+                        yield message[1], message[2]
+                    elif message[0] == "error":
+                        current_page = None
+                        next_page = message[1] + 1
+                        progressed = True
+                        self._flag_page(message[1], message[2])
+                    elif message[0] == "done":
+                        next_page = total_pages
+                        break
+            finally:
+                receiver.close()
+                if worker.is_alive():
+                    worker.kill()
+                worker.join()
+
+            # a worker that dies before reaching any page would otherwise be restarted forever
+            restarts_without_progress = 0 if progressed else restarts_without_progress + 1
+            if restarts_without_progress >= 3:
+                raise RuntimeError(f"Page extraction worker for {self.__pdf_name} keeps exiting with code {worker.exitcode}")
+
+    # _wait_for_worker
+    def _wait_for_worker(self, receiver, worker, page_timeout: float, memory_bytes: int) -> str:
+        """Waits for the next message of the worker, checking its memory every memory_check_interval seconds.
+
+        Returns:
+            str: "ready" once there is a message, or the worker has exited, else "timeout" or "memory".
+        """
+        deadline = time.monotonic() + page_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return "timeout"
+            if receiver.poll(min(remaining, self.memory_check_interval)):
+                return "ready"
+            if memory_bytes:
+                memory = _process_memory(worker.pid)
+                if memory is not None and memory > memory_bytes:
+                    return "memory"
+
+    # _flag_page
+    def _flag_page(self, page_number: int, reason: str):
+        """Records a page that has been skipped in isolated mode.
+        """
+        self.flagged_pages.append((page_number, reason))
+        if self.__logger is not None:
+            self.__logger.write(f"[PDF_HANDLER] flagged page={page_number + 1} of {self.__pdf_name}, reason={reason}\n")
+
+    # _extract_order
+    def _extract_order(self, content: str, o_type: str, logged_in_user: str):
+        """Extracts the order details from the text of one page.
+
+        Returns:
+            _type_: None if the page has no order else [order_number, date, time, user].
+        """
+        if o_type == 'web':
+            # using regex to extract order number patter
+            data = re.search(string=content, pattern='Order[ ]Number..+[0-9]')
+            if data:
+                date = datetime.now().date().strftime("%d-%m-%Y")
+                time = datetime.now().time().strftime("%I:%M %p")
+                # splitting the match and then converting order number into int just to contain numbers only in integer format
+                order_number = int(data.group(0).split(': ')[1])
+                # if a matching pattern is found, return the details
+                return [order_number, date, time, logged_in_user]
+        elif o_type == 'ebay':
+            raise NotImplemented
+        elif o_type == 'payslips':
+            raise NotImplemented
+        return None
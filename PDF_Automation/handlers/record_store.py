@@ -0,0 +1,254 @@
+
+# This file contains the OrderRecordStore class
+
+# IMPORTS!
+from array import array
+from bisect import bisect_left
+from datetime import datetime, date, time
+
+class OrderRecordStore:
+    """Holds order records in typed arrays instead of Python lists of boxed objects.
+
+    Each order takes 8 bytes for the order number, 4 for the date, 2 for the time and 4 for the user,
+    so 5 million orders fit in roughly 100 MB instead of several GB. Usernames are dictionary encoded,
+    the few distinct names are stored once and every record only keeps an index into them.
+
+    Rows that can't be encoded, e.g. a hand edited order number like ABC-1 or a date in another format,
+    are kept as they are in skipped, so they still count for lookups and searches instead of failing the load.
+    """
+
+    __date_format: str = "%d-%m-%Y"             # Format of the DATE column, e.g. 19-01-2026
+    __time_format: str = "%I:%M %p"             # Format of the TIME column, e.g. 10:30 AM
+    __missing: int = -1                         # Stored in place of an empty date, time or user
+
+    # constructor
+    def __init__(self) -> None:
+        """Initialize an empty OrderRecordStore instance.
+        """
+        self.orders = array('q')                # int64 order numbers
+        self.dates = array('i')                 # date ordinals, see datetime.date.toordinal
+        self.times = array('h')                 # minutes since midnight
+        self.users = array('i')                 # indexes into user_names
+        self.user_names = []                    # distinct usernames, in the order they were first seen
+        self.skipped = []                       # rows that couldn't be encoded, kept as they are
+        self.__skipped_orders = set()           # order numbers of the skipped rows, see _order_key
+        self.__user_codes = {}                  # username -> index into user_names
+        self.__parsed_dates = {}                # date string -> ordinal, a ledger only has a few distinct dates
+        self.__parsed_times = {}                # time string -> minutes, at most 1440 distinct times
+        self.__sorted_orders = None             # sorted copy of orders, built on the first lookup
+
+    # from_rows
+    @classmethod
+    def from_rows(cls, rows):
+        """Builds a store from ledger rows, e.g. worksheet.iter_rows(min_row=2, values_only=True).
+        Empty rows are skipped.
+        """
+        store = cls()
+        for row in rows:
+            # skipping empty rows, just in case
+            if not row or row[0] is None or row[0] == "":
+                continue
+            store.append(row)
+        return store
+
+    # append
+    def append(self, order) -> None:
+        """Appends an order as given by PDFHandler.fetch_order_details, i.e. [order_number, date, time, user].
+        The date, time and user are optional. Orders that can't be encoded are added to skipped instead.
+        """
+        try:
+            # encoding every column first, so that a failing one doesn't leave the arrays out of step
+            encoded = (
+                int(order[0]),
+                self._encode_date(order[1] if len(order) > 1 else None),
+                self._encode_time(order[2] if len(order) > 2 else None),
+            )
+            if not -(1 << 63) <= encoded[0] < (1 << 63):
+                raise OverflowError(f"order number {encoded[0]} doesn't fit in int64")
+        except (TypeError, ValueError, OverflowError):
+            self.skipped.append(list(order))
+            self.__skipped_orders.add(self._order_key(order[0]))
+            return
+        self.orders.append(encoded[0])
+        self.dates.append(encoded[1])
+        self.times.append(encoded[2])
+        self.users.append(self._encode_user(order[3] if len(order) > 3 else None))
+        self.__sorted_orders = None
+
+    # extend
+    def extend(self, orders) -> None:
+        """Appends every order of the given iterable.
+        """
+        for order in orders:
+            self.append(order)
+
+    # __len__
+    def __len__(self) -> int:
+        return len(self.orders) + len(self.skipped)
+
+    # __getitem__
+    def __getitem__(self, index: int) -> list:
+        """Decodes a record back into a ledger row, i.e. [order_number, "dd-mm-YYYY", "hh:mm AM", user].
+        Indexes past the encoded records return the skipped rows.
+        """
+        if index < 0:
+            index += len(self)
+        if index >= len(self.orders):
+            return list(self.skipped[index - len(self.orders)])
+        return [
+            self.orders[index],
+            self._decode_date(self.dates[index]),
+            self._decode_time(self.times[index]),
+            self._decode_user(self.users[index]),
+        ]
+
+    # __iter__
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    # __contains__
+    def __contains__(self, order_number) -> bool:
+        """Checks whether an order number is in the store, using a binary search over a sorted copy of the orders.
+        """
+        if self.__skipped_orders and self._order_key(order_number) in self.__skipped_orders:
+            return True
+        try:
+            order_number = int(order_number)
+        except (TypeError, ValueError):
+            return False
+        if self.__sorted_orders is None:
+            self.__sorted_orders = array('q', sorted(self.orders))
+        i = bisect_left(self.__sorted_orders, order_number)
+        return i < len(self.__sorted_orders) and self.__sorted_orders[i] == order_number
+
+    # order_numbers
+    def order_numbers(self):
+        """Yields every order number, the skipped ones as they were given.
+        """
+        yield from self.orders
+        for row in self.skipped:
+            yield row[0]
+
+    # _order_key
+    @staticmethod
+    def _order_key(order_number):
+        """Lookup key of a skipped order number, the int if it is one, e.g. "555" and 555 are the same order.
+        """
+        try:
+            return int(order_number)
+        except (TypeError, ValueError, OverflowError):
+            return str(order_number).strip()
+
+    # nbytes
+    def nbytes(self) -> int:
+        """Number of bytes taken by the record arrays, not counting the usernames dictionary.
+        """
+        return sum(a.itemsize * len(a) for a in (self.orders, self.dates, self.times, self.users))
+
+    # search
+    def search(self, _type: str, search_value: str):
+        """Yields the matching records as ledger rows, same rules as ExcelHandler.search.
+
+        Args:
+            _type (str): It can be either ["order", "date", "user"]
+            search_value (str): Value to search for.
+        """
+        yield from self._search_encoded(_type, search_value)
+        if self.skipped:
+            from .excel_handler import ExcelHandler
+            for row in self.skipped:
+                if ExcelHandler._matches(row, _type, search_value):
+                    yield list(row)
+
+    # _search_encoded
+    def _search_encoded(self, _type: str, search_value: str):
+        if _type == "order":
+            try:
+                target = int(search_value)
+            except ValueError:
+                return
+            # str(int) comparison, e.g. "0123" never matched an order number in the ledger either
+            if str(target) != search_value:
+                return
+            column = self.orders
+            for i in range(len(column)):
+                if column[i] == target:
+                    yield self[i]
+        elif _type == "date":
+            try:
+                target = self._encode_date(search_value)
+            except ValueError:
+                return
+            column = self.dates
+            for i in range(len(column)):
+                if column[i] == target:
+                    yield self[i]
+        elif _type == "user":
+            # matching against the few distinct usernames first, then only comparing integer codes
+            value = search_value.lower()
+            codes = {code for code, name in enumerate(self.user_names) if value in name.lower()}
+            if not codes:
+                return
+            column = self.users
+            for i in range(len(column)):
+                if column[i] in codes:
+                    yield self[i]
+
+    # _encode_date
+    def _encode_date(self, value) -> int:
+        if value is None or value == "":
+            return self.__missing
+        if isinstance(value, datetime):
+            return value.date().toordinal()
+        if isinstance(value, date):
+            return value.toordinal()
+        ordinal = self.__parsed_dates.get(value)
+        if ordinal is None:
+            ordinal = datetime.strptime(str(value), self.__date_format).date().toordinal()
+            self.__parsed_dates[value] = ordinal
+        return ordinal
+
+    # _decode_date
+    def _decode_date(self, value: int):
+        if value == self.__missing:
+            return None
+        return date.fromordinal(value).strftime(self.__date_format)
+
+    # _encode_time
+    def _encode_time(self, value) -> int:
+        if value is None or value == "":
+            return self.__missing
+        # Excel keeps times typed into a cell as datetime.time
+        if isinstance(value, (datetime, time)):
+            return value.hour * 60 + value.minute
+        minutes = self.__parsed_times.get(value)
+        if minutes is None:
+            parsed = datetime.strptime(str(value), self.__time_format)
+            minutes = parsed.hour * 60 + parsed.minute
+            self.__parsed_times[value] = minutes
+        return minutes
+
+    # _decode_time
+    def _decode_time(self, value: int):
+        if value == self.__missing:
+            return None
+        return datetime(2000, 1, 1, value // 60, value % 60).strftime(self.__time_format)
+
+    # _encode_user
+    def _encode_user(self, value) -> int:
+        if value is None or value == "":
+            return self.__missing
+        value = str(value)
+        code = self.__user_codes.get(value)
+        if code is None:
+            code = len(self.user_names)
+            self.user_names.append(value)
+            self.__user_codes[value] = code
+        return code
+
+    # _decode_user
+    def _decode_user(self, value: int):
+        if value == self.__missing:
+            return None
+        return self.user_names[value]
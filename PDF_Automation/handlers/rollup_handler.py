@@ -0,0 +1,218 @@
+
+# This file contains the RollupHandler class
+
+# IMPORTS!
+import copy
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+from .bloom_filter import BloomFilter
+
+class RollupHandler:
+    """Responsible for keeping order counts per DATE, per USER and per DATE x USER next to the ledger.
+
+    The counts are updated by ExcelHandler.write as orders are written, so questions like
+    "orders per user per day" don't need a scan of the ledger. They are persisted to a small JSON file
+    once the ledger has been saved, and can be rebuilt from the ledger if they ever drift.
+
+    Several processes can share one rollup file. Each save only adds the counts taken with take_changes
+    to what is in the file, under a lock file, so the orders the others have saved meanwhile are kept.
+    """
+
+    __filename: str = None                      # Name of the JSON file the rollups are persisted to
+    __changes: dict = None                      # Counts added since the last take_changes
+    __version: tuple = None                     # Version of the file the counts were last read from
+    __lock: threading.Lock = None               # Guards the counts, they are saved from the background save thread
+
+    # constructor
+    def __init__(self, filename: str) -> None:
+        """Initialize a RollupHandler instance, loading the rollups from the file if it exists.
+        """
+        # Validations!
+        assert type(filename) == str, "filename needs to be string"
+        assert filename != "", "filename cannot be none"
+
+        # initializing
+        self.__filename = filename
+        self.__lock = threading.Lock()
+        self.reload()
+
+    # reload
+    def reload(self) -> None:
+        """Discards the in memory counts, including the ones not saved yet, and reads them from the file again.
+        """
+        with self.__lock:
+            self.__changes = self._empty()
+            self._set_counts(self._read())
+
+    # refresh
+    def refresh(self) -> None:
+        """Reads the counts other processes have saved meanwhile, keeping the ones not saved yet.
+        """
+        if BloomFilter.file_version(self.__filename) == self.__version:
+            return
+        counts = self._read()
+        with self.__lock:
+            self._add(counts, self.__changes)
+            self._set_counts(counts)
+
+    # update
+    def update(self, orders) -> None:
+        """Adds orders to the counts, orders are [order_number, date, time, user] as written to the ledger.
+        Rows without a date or user, e.g. from indexing, only count where they can.
+        """
+        counts = self._empty()
+        for order in orders:
+            date = self._date_text(order[1]) if len(order) > 1 else None
+            user = str(order[3]).strip() if len(order) > 3 and order[3] is not None else None
+            if date:
+                counts["by_date"][date] = counts["by_date"].get(date, 0) + 1
+            if user:
+                counts["by_user"][user] = counts["by_user"].get(user, 0) + 1
+            if date and user:
+                users = counts["by_date_user"].setdefault(date, {})
+                users[user] = users.get(user, 0) + 1
+        with self.__lock:
+            self._add({"by_date": self.by_date, "by_user": self.by_user, "by_date_user": self.by_date_user}, counts)
+            self._add(self.__changes, counts)
+
+    # take_changes
+    def take_changes(self) -> dict:
+        """Hands over the counts added since the last call, to be saved along with the ledger.
+        """
+        with self.__lock:
+            changes = self.__changes
+            self.__changes = self._empty()
+        return changes
+
+    # rebuild
+    def rebuild(self, rows) -> None:
+        """Recounts everything from the ledger rows, e.g. worksheet.iter_rows(min_row=2, values_only=True),
+        and saves the result over the file.
+        """
+        with self.__lock:
+            self.__changes = self._empty()
+            self._set_counts(self._empty())
+        # skipping empty rows, just in case
+        self.update(row for row in rows if row and row[0])
+        self.save(changes=self.take_changes(), replace=True)
+
+    # snapshot
+    def snapshot(self) -> dict:
+        """A copy of the counts, which can be read from another thread while these keep changing.
+        """
+        with self.__lock:
+            return copy.deepcopy({"by_date": self.by_date, "by_user": self.by_user, "by_date_user": self.by_date_user})
+
+    # save
+    def save(self, changes: dict, replace: bool = False) -> None:
+        """Adds the changes, from take_changes, to the counts in the file and atomically renames the result
+        into place. The in memory counts are then the file plus whatever was added since the changes were taken.
+
+        Args:
+            changes (dict): Counts to add to the file.
+            replace (bool): If True, the changes are written as they are instead of being added to the file.
+        """
+        directory = os.path.dirname(os.path.abspath(self.__filename))
+        with BloomFilter._lock(self.__filename):
+            counts = self._empty() if replace else self._read()
+            self._add(counts, changes)
+            fd, temp_filename = tempfile.mkstemp(prefix=".rollups-", dir=directory)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                    json.dump(counts, file)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_filename, self.__filename)
+            finally:
+                if os.path.exists(temp_filename):
+                    os.remove(temp_filename)
+            version = BloomFilter.file_version(self.__filename)
+        with self.__lock:
+            self._add(counts, self.__changes)
+            self._set_counts(counts)
+            self.__version = version
+
+    # _read
+    def _read(self) -> dict:
+        """The counts in the file, empty if there is no file yet.
+        """
+        self.__version = BloomFilter.file_version(self.__filename)
+        try:
+            with open(self.__filename, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return self._empty()
+        return {"by_date": state["by_date"], "by_user": state["by_user"], "by_date_user": state["by_date_user"]}
+
+    # _set_counts
+    def _set_counts(self, counts: dict) -> None:
+        self.by_date = counts["by_date"]                # date -> count
+        self.by_user = counts["by_user"]                # user -> count
+        self.by_date_user = counts["by_date_user"]      # date -> {user -> count}
+
+    # _empty
+    @staticmethod
+    def _empty() -> dict:
+        return {"by_date": {}, "by_user": {}, "by_date_user": {}}
+
+    # _add
+    @staticmethod
+    def _add(counts: dict, changes: dict) -> None:
+        """Adds the changes to the counts, in place.
+        """
+        for key in ("by_date", "by_user"):
+            for name, count in changes[key].items():
+                counts[key][name] = counts[key].get(name, 0) + count
+        for date, users in changes["by_date_user"].items():
+            counted = counts["by_date_user"].setdefault(date, {})
+            for user, count in users.items():
+                counted[user] = counted.get(user, 0) + count
+
+    # _date_text
+    @staticmethod
+    def _date_text(value) -> str:
+        """A DATE cell as a dd-mm-YYYY string, Excel stores dates typed into the ledger as datetime.
+        """
+        if value is None or value == "":
+            return None
+        if isinstance(value, (datetime, date)):
+            return value.strftime("%d-%m-%Y")
+        return str(value).strip()
+
+    # per_date
+    def per_date(self) -> list:
+        """Returns:
+            list: (date, count) tuples, oldest date first.
+        """
+        return sorted(self.by_date.items(), key=lambda item: self._date_key(item[0]))
+
+    # per_user
+    def per_user(self) -> list:
+        """Returns:
+            list: (user, count) tuples, busiest user first.
+        """
+        return sorted(self.by_user.items(), key=lambda item: (-item[1], item[0]))
+
+    # per_date_user
+    def per_date_user(self) -> list:
+        """Returns:
+            list: (date, user, count) tuples, oldest date first.
+        """
+        rows = []
+        for date in sorted(self.by_date_user, key=self._date_key):
+            for user, count in sorted(self.by_date_user[date].items()):
+                rows.append((date, user, count))
+        return rows
+
+    # _date_key
+    @staticmethod
+    def _date_key(date: str):
+        """Sort key of a dd-mm-YYYY date.
+        """
+        parts = str(date).split('-')
+        if len(parts) != 3:
+            return (str(date),)
+        return (parts[2], parts[1], parts[0])
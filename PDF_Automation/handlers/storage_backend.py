@@ -0,0 +1,428 @@
+
+# This file contains the StorageBackend interface and the ParquetArchive backend
+
+# IMPORTS!
+import json
+import os
+from abc import ABC, abstractmethod
+import tempfile
+import time
+import uuid
+from datetime import date, datetime
+import openpyxl
+
+class StorageBackend(ABC):
+    """Interface of the storages ExcelHandler keeps in sync with the ledger, next to the xlsx file itself.
+    Backends have to implement append and iter_rows, search and mark_stale have defaults.
+
+    Rows are [order_number, date, time, user] as written to the ledger, with the date as dd-mm-YYYY.
+    """
+
+    # append
+    @abstractmethod
+    def append(self, orders: list) -> None:
+        """Adds orders that have just been saved to the ledger.
+        """
+
+    # iter_rows
+    @abstractmethod
+    def iter_rows(self, columns: list = None):
+        """Yields every row, or only the given columns of it.
+        """
+
+    # search
+    def search(self, _type: str, search_value: str):
+        """Yields the rows matching the search, same rules as ExcelHandler.search.
+        """
+        from .excel_handler import ExcelHandler
+        for row in self.iter_rows():
+            if ExcelHandler._matches(row, _type, search_value):
+                yield row
+
+    # mark_stale
+    def mark_stale(self) -> None:
+        """Called when saved orders couldn't be appended, the backend is missing them until it is caught up.
+        """
+        pass
+
+    # mark_synced
+    def mark_synced(self, filename: str, previous_version: list) -> None:
+        """Called once the orders of a save have been appended.
+
+        Args:
+            filename (str): The ledger that was saved.
+            previous_version (list): ledger_version of the ledger right before the save.
+        """
+        pass
+
+    # is_synced
+    def is_synced(self, filename: str) -> bool:
+        """Checks whether the backend holds every row of the ledger, searches read the xlsx file if it doesn't.
+        """
+        return True
+
+    # ledger_version
+    @staticmethod
+    def ledger_version(filename: str) -> list:
+        """Returns:
+            list: [mtime_ns, size] of the ledger, or None if it doesn't exist.
+        """
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return None
+        return [stat.st_mtime_ns, stat.st_size]
+
+
+class ParquetArchive(StorageBackend):
+    """A columnar archive of the ledger, a directory of Parquet files that can be queried without openpyxl.
+
+    Every append adds one file, compact merges them back into one. Searches only read the needed columns
+    and skip row groups using the Parquet statistics. The directory can also be queried with DuckDB,
+    e.g. SELECT "USER", COUNT(*) FROM read_parquet('archive/*.parquet') GROUP BY 1, see query_sql.
+    Needs pyarrow to be installed.
+
+    The xlsx ledgers copied in by migrate_from_xlsx are recorded in the directory, so migrating the same
+    ledger again only copies the orders that aren't in the archive yet.
+    """
+
+    __directory: str = None                     # Directory containing the parquet files
+    __batch_size: int = 100_000                 # Number of rows per file when migrating
+    __date_format: str = "%d-%m-%Y"             # Format of the DATE column in the ledger, e.g. 19-01-2026
+    __migrations_name: str = "migrations.json"  # File in the directory recording the migrated ledgers
+    columns = ["ORDER_DETAILS", "DATE", "TIME", "USER"]
+
+    # constructor
+    def __init__(self, directory: str, batch_size: int = 100_000) -> None:
+        """Initialize a ParquetArchive instance, creating the directory if it doesn't exist yet.
+        """
+        # Validations!
+        assert type(directory) == str, "directory needs to be string"
+        assert directory != "", "directory cannot be none"
+
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("The parquet archive needs pyarrow, install it with 'pip install pyarrow'")
+
+        # initializing
+        self.__directory = directory
+        self.__batch_size = batch_size
+        os.makedirs(directory, exist_ok=True)
+
+    # _schema
+    @staticmethod
+    def _schema():
+        import pyarrow as pa
+        # dates are stored as real dates, so that reports can filter on ranges of them
+        return pa.schema([
+            pa.field("ORDER_DETAILS", pa.int64()),
+            pa.field("DATE", pa.date32()),
+            pa.field("TIME", pa.string()),
+            pa.field("USER", pa.string()),
+        ])
+
+    # _files
+    def _files(self) -> list:
+        return sorted(
+            os.path.join(self.__directory, name) for name in os.listdir(self.__directory)
+            if name.endswith(".parquet") and not name.startswith(".")
+        )
+
+    # _dataset
+    def _dataset(self):
+        import pyarrow.dataset as ds
+        return ds.dataset(self._files(), schema=self._schema(), format="parquet")
+
+    # is_empty
+    def is_empty(self) -> bool:
+        return not self._files()
+
+    # _parse_date
+    def _parse_date(self, value):
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        return datetime.strptime(str(value), self.__date_format).date()
+
+    # _to_table
+    def _to_table(self, orders: list):
+        """Converts orders to a pyarrow Table, rows that don't fit the schema, e.g. a hand edited
+        order number like ABC-1 or a date in another format, are left out.
+
+        Returns:
+            tuple: (table, number of rows left out)
+        """
+        import pyarrow as pa
+
+        columns = [[], [], [], []]
+        skipped = 0
+        for order in orders:
+            try:
+                order_number = int(order[0])
+                date = self._parse_date(order[1] if len(order) > 1 else None)
+                if not -(1 << 63) <= order_number < (1 << 63):
+                    raise OverflowError(f"order number {order_number} doesn't fit in int64")
+            except (TypeError, ValueError, OverflowError):
+                skipped += 1
+                continue
+            columns[0].append(order_number)
+            columns[1].append(date)
+            columns[2].append(str(order[2]) if len(order) > 2 and order[2] is not None else None)
+            columns[3].append(str(order[3]) if len(order) > 3 and order[3] is not None else None)
+        return pa.Table.from_arrays(columns, schema=self._schema()), skipped
+
+    # _write_file
+    def _write_file(self, orders: list) -> None:
+        """Writes orders as a new parquet file, see _write_table.
+        """
+        table, skipped = self._to_table(orders)
+        self._write_table(table)
+
+    # _write_table
+    def _write_table(self, table) -> None:
+        """Writes a table as a new parquet file, named so that files sort in the order they were written.
+        The file is written under a hidden name first, readers never see a half written file.
+        """
+        import pyarrow.parquet as pq
+
+        if table.num_rows == 0:
+            return
+        name = f"part-{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.parquet"
+        temp_filename = os.path.join(self.__directory, "." + name)
+        pq.write_table(table, temp_filename)
+        os.replace(temp_filename, os.path.join(self.__directory, name))
+
+    # append
+    def append(self, orders: list) -> None:
+        """Adds orders that have just been saved to the ledger as a new file.
+        """
+        orders = [order for order in orders if order and order[0] is not None and order[0] != ""]
+        if orders:
+            self._write_file(orders)
+
+    # query
+    def query(self, columns: list = None, filter=None):
+        """Reads the archive into a pyarrow Table, only the given columns and only the row groups that
+        can match the filter are read.
+
+        Args:
+            columns (list): Column names to read, e.g. ["DATE", "USER"], defaults to all of them.
+            filter (pyarrow.dataset.Expression): e.g. pyarrow.dataset.field("DATE") >= datetime.date(2026, 1, 1)
+        """
+        if self.is_empty():
+            return self._schema().empty_table().select(columns or self.columns)
+        return self._dataset().to_table(columns=columns, filter=filter)
+
+    # iter_rows
+    def iter_rows(self, columns: list = None, filter=None):
+        """Yields rows as written to the ledger, reading the archive one record batch at a time.
+        """
+        if self.is_empty():
+            return
+        columns = columns or self.columns
+        for batch in self._dataset().to_batches(columns=columns, filter=filter):
+            data = batch.to_pydict()
+            if "DATE" in data:
+                data["DATE"] = [value.strftime(self.__date_format) if value is not None else None for value in data["DATE"]]
+            for row in zip(*(data[column] for column in columns)):
+                yield row
+
+    # search
+    def search(self, _type: str, search_value: str):
+        """Yields the rows matching the search, same rules as ExcelHandler.search, using predicate pushdown.
+        """
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+
+        if _type == "order":
+            try:
+                order_number = int(search_value)
+            except ValueError:
+                return
+            # str(int) comparison, e.g. "0123" never matched an order number in the ledger either
+            if str(order_number) != search_value:
+                return
+            expression = ds.field("ORDER_DETAILS") == order_number
+        elif _type == "date":
+            try:
+                expression = ds.field("DATE") == self._parse_date(search_value)
+            except ValueError:
+                return
+        elif _type == "user":
+            expression = pc.match_substring(ds.field("USER"), search_value, ignore_case=True)
+        else:
+            return
+        yield from self.iter_rows(filter=expression)
+
+    # compact
+    def compact(self) -> None:
+        """Merges every file of the archive into one, ordered by order number.
+        """
+        files = self._files()
+        if len(files) < 2:
+            return
+        table = self._dataset().to_table().sort_by("ORDER_DETAILS")
+        self._write_table(table)
+        for filename in files:
+            os.remove(filename)
+
+    # migrate_from_xlsx
+    def migrate_from_xlsx(self, filename: str) -> int:
+        """Copies the rows of an xlsx ledger into the archive, reading it in read only mode and writing
+        one file per batch_size rows, so yearly ledgers can be migrated one after another.
+
+        Orders already in the archive, from an earlier migration or from live syncing, aren't copied again,
+        and a ledger that hasn't changed since it was last migrated isn't read at all. Rows that don't fit
+        the archive, e.g. a hand edited order number like ABC-1, are left out and counted in the record.
+
+        Returns:
+            int: Number of rows copied.
+        """
+        import pyarrow.compute as pc
+        from .checkpoint_handler import CheckpointHandler
+
+        key = os.path.abspath(filename)
+        version = self.ledger_version(filename)
+        file_hash = CheckpointHandler.file_hash(filename)
+        migrations = self._load_migrations()
+        record = migrations.get(key)
+        if record is not None and record["sha256"] == file_hash and not record.get("stale"):
+            if record.get("version") != version:
+                record["version"] = version
+                self._save_migrations(migrations)
+            return 0
+
+        existing = pc.unique(self.query(columns=["ORDER_DETAILS"]).column("ORDER_DETAILS"))
+        count = 0
+        skipped = 0
+
+        def flush(batch):
+            nonlocal count, skipped
+            table, left_out = self._to_table(batch)
+            skipped += left_out
+            if len(existing):
+                table = table.filter(pc.invert(pc.is_in(table.column("ORDER_DETAILS"), value_set=existing)))
+            self._write_table(table)
+            count += table.num_rows
+
+        wb = openpyxl.load_workbook(filename=filename, read_only=True)
+        try:
+            batch = []
+            for row in wb.active.iter_rows(min_row=2, values_only=True):
+                # skipping empty rows, just in case
+                if not row or row[0] is None or row[0] == "":
+                    continue
+                batch.append(row)
+                if len(batch) >= self.__batch_size:
+                    flush(batch)
+                    batch = []
+            if batch:
+                flush(batch)
+        finally:
+            wb.close()
+
+        copied = count + (record["copied"] if record is not None else 0)
+        migrations[key] = {"sha256": file_hash, "version": version, "copied": copied, "skipped": skipped}
+        self._save_migrations(migrations)
+        return count
+
+    # mark_stale
+    def mark_stale(self) -> None:
+        """Marks every migrated ledger as needing another migration, which copies the orders that are missing.
+        """
+        migrations = self._load_migrations()
+        for record in migrations.values():
+            record["stale"] = True
+        self._save_migrations(migrations)
+
+    # is_migrated
+    def is_migrated(self, filename: str) -> bool:
+        """Checks whether an xlsx ledger has been migrated and hasn't changed since, apart from the saves
+        appended to the archive. Rows added in Excel, or by a desk without the archive, need another migration.
+        """
+        record = self._load_migrations().get(os.path.abspath(filename))
+        if record is None or record.get("stale"):
+            return False
+        if record.get("version") == self.ledger_version(filename):
+            return True
+        from .checkpoint_handler import CheckpointHandler
+        return record["sha256"] == CheckpointHandler.file_hash(filename)
+
+    # is_synced
+    def is_synced(self, filename: str) -> bool:
+        """Checks whether the archive holds every row of the ledger, without reading the ledger.
+        Ledgers with rows the archive can't hold, e.g. a hand edited order number like ABC-1, never are.
+        """
+        record = self._load_migrations().get(os.path.abspath(filename))
+        return (
+            record is not None and not record.get("stale") and not record["skipped"]
+            and record.get("version") == self.ledger_version(filename)
+        )
+
+    # mark_synced
+    def mark_synced(self, filename: str, previous_version: list) -> None:
+        """Records the ledger as migrated after a save whose orders have been appended, as long as it was
+        in sync right before the save. A ledger that didn't exist yet starts out in sync.
+        """
+        from .checkpoint_handler import CheckpointHandler
+
+        key = os.path.abspath(filename)
+        migrations = self._load_migrations()
+        record = migrations.get(key)
+        if record is None:
+            if previous_version is not None:
+                return
+            record = migrations[key] = {"copied": 0, "skipped": 0}
+        elif record.get("stale") or record.get("version") != previous_version:
+            return
+        record["version"] = self.ledger_version(filename)
+        record["sha256"] = CheckpointHandler.file_hash(filename)
+        self._save_migrations(migrations)
+
+    # _load_migrations
+    def _load_migrations(self) -> dict:
+        try:
+            with open(os.path.join(self.__directory, self.__migrations_name), 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+    # _save_migrations
+    def _save_migrations(self, migrations: dict) -> None:
+        fd, temp_filename = tempfile.mkstemp(prefix=".migrations-", dir=self.__directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(migrations, file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_filename, os.path.join(self.__directory, self.__migrations_name))
+        finally:
+            if os.path.exists(temp_filename):
+                os.remove(temp_filename)
+
+    # query_sql
+    def query_sql(self, sql: str):
+        """Runs a DuckDB query over the archive, which is available as the view "ledger". Needs duckdb to be installed.
+
+        Returns:
+            list: Rows of the result.
+        """
+        try:
+            import duckdb
+        except ImportError:
+            raise ImportError("SQL queries over the archive need duckdb, install it with 'pip install duckdb'")
+        connection = duckdb.connect()
+        try:
+            files = self._files()
+            if not files:
+                raise FileNotFoundError(f"The archive {self.__directory} is empty")
+            # views can't take parameters, quoting the file names instead
+            quoted = ", ".join("'" + name.replace("'", "''") + "'" for name in files)
+            connection.execute(f"CREATE VIEW ledger AS SELECT * FROM read_parquet([{quoted}])")
+            return connection.execute(sql).fetchall()
+        finally:
+            connection.close()
@@ -0,0 +1,337 @@
+
+
+# This file contains the JobQueue class and the worker loop that pulls PDFs from it
+
+# IMPORTS !!!
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from .handlers.pdf_handler import PDFHandler
+
+class JobQueue:
+    """A durable queue of PDFs to extract, backed by a SQLite database.
+
+    Any number of worker processes can claim jobs from it. A claimed job is leased to one worker for a
+    while, if the worker dies the lease expires and the job is handed out again. Jobs failing more than
+    max_attempts times are dead lettered, so one poison file can't keep the workers busy forever.
+    Extracted orders are kept in the queue until a single writer commits them to the ledger.
+
+    Job statuses:
+        queued -> leased -> done -> committed
+                         -> queued (retry) or dead
+
+    The database uses SQLite's rollback journal (DELETE) by default, which only needs file locking and so
+    also works for a queue on a shared network drive. WAL lets readers run alongside the writer, but it
+    needs shared memory and only works with every worker on the same machine; it can be chosen with
+    journal_mode, or QUEUE_JOURNAL_MODE=WAL for the workers main.py starts.
+    """
+
+    __filename: str = None                      # Name of the SQLite database file
+    __max_attempts: int = 3                     # Number of times a job is tried before it is dead lettered
+    __journal_modes = ("DELETE", "TRUNCATE", "PERSIST", "WAL")  # SQLite journal modes that keep the queue durable
+    __connection = None                         # SQLite connection, one per process
+
+    # constructor
+    def __init__(self, filename: str, max_attempts: int = 3, journal_mode: str = None) -> None:
+        """Initialize a JobQueue instance, creating the database if it doesn't exist yet.
+
+        Args:
+            journal_mode (str): SQLite journal mode, defaults to QUEUE_JOURNAL_MODE or else DELETE.
+        """
+        if journal_mode is None:
+            # read here, so the worker processes started from this one use the same mode
+            journal_mode = os.getenv("QUEUE_JOURNAL_MODE") or "DELETE"
+        journal_mode = journal_mode.upper()
+
+        # Validations!
+        assert type(filename) == str, "filename needs to be string"
+        assert filename != "", "filename cannot be none"
+        assert type(max_attempts) == int and max_attempts > 0, "max_attempts needs to be a positive int"
+        assert journal_mode in self.__journal_modes, f"journal_mode needs to be one of {', '.join(self.__journal_modes)}"
+
+        # initializing
+        self.__filename = filename
+        self.__max_attempts = max_attempts
+        # transactions are handled explicitly, see _transaction
+        self.__connection = sqlite3.connect(filename, timeout=30, isolation_level=None)
+        self.__connection.row_factory = sqlite3.Row
+        self.__connection.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.__connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                user TEXT,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_owner TEXT,
+                lease_expires REAL,
+                error TEXT,
+                result TEXT,
+                flagged_pages TEXT,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            )
+        """)
+        self.__connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+
+    # close
+    def close(self):
+        self.__connection.close()
+
+    # submit
+    def submit(self, filename: str, user: str = None) -> int:
+        """Adds a PDF to the queue.
+
+        Args:
+            filename (str): Name of the PDF.
+            user (str): Username the orders are credited to, defaults to the user running the worker.
+
+        Returns:
+            int: Id of the new job.
+        """
+        assert type(filename) == str, "filename needs to be string"
+        assert filename != "", "filename cannot be none"
+        now = time.time()
+        cursor = self.__connection.execute(
+            "INSERT INTO jobs (filename, user, created, updated) VALUES (?, ?, ?, ?)",
+            (os.path.abspath(filename), user, now, now)
+        )
+        return cursor.lastrowid
+
+    # claim
+    def claim(self, worker_id: str, lease_seconds: float = 300):
+        """Leases the oldest queued job, or a job whose lease has expired, to the given worker.
+
+        Returns:
+            _type_: None if there is nothing to do else a dict with the job "id", "filename" and "user".
+        """
+        now = time.time()
+        # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same job
+        self.__connection.execute("BEGIN IMMEDIATE")
+        try:
+            # jobs whose worker died on every attempt are poison, dead lettering them
+            self.__connection.execute(
+                "UPDATE jobs SET status = 'dead', error = 'lease expired', lease_owner = NULL, updated = ? "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.__max_attempts)
+            )
+            row = self.__connection.execute(
+                "SELECT id, filename, user FROM jobs "
+                "WHERE status = 'queued' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                self.__connection.execute("COMMIT")
+                return None
+            self.__connection.execute(
+                "UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated = ? "
+                "WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"])
+            )
+            self.__connection.execute("COMMIT")
+        except Exception:
+            self.__connection.execute("ROLLBACK")
+            raise
+        return {"id": row["id"], "filename": row["filename"], "user": row["user"]}
+
+    # renew
+    def renew(self, job_id: int, worker_id: str, lease_seconds: float = 300) -> bool:
+        """Extends the lease of a job that is still being worked on.
+
+        Returns:
+            bool: False if the lease has been lost to another worker.
+        """
+        now = time.time()
+        cursor = self.__connection.execute(
+            "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (now + lease_seconds, now, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    # complete
+    def complete(self, job_id: int, worker_id: str, orders: list, flagged_pages: list = None) -> bool:
+        """Stores the extracted orders of a job, they are committed to the ledger by commit_results.
+        flagged_pages are the (page_number, reason) of pages skipped in isolated mode.
+
+        Returns:
+            bool: False if the lease has been lost to another worker, the orders are dropped in that case.
+        """
+        now = time.time()
+        cursor = self.__connection.execute(
+            "UPDATE jobs SET status = 'done', result = ?, flagged_pages = ?, lease_owner = NULL, error = NULL, updated = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (json.dumps([list(order) for order in orders]), json.dumps([list(page) for page in flagged_pages or []]),
+             now, job_id, worker_id)
+        )
+        return cursor.rowcount == 1
+
+    # fail
+    def fail(self, job_id: int, worker_id: str, error: str) -> None:
+        """Puts a failed job back in the queue, or dead letters it once it has used all of its attempts.
+        """
+        now = time.time()
+        self.__connection.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'dead' ELSE 'queued' END, "
+            "error = ?, lease_owner = NULL, updated = ? "
+            "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+            (self.__max_attempts, error, now, job_id, worker_id)
+        )
+
+    # retry
+    def retry(self, job_id: int) -> None:
+        """Moves a dead lettered job back to the queue with a fresh set of attempts.
+        """
+        self.__connection.execute(
+            "UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, updated = ? WHERE id = ? AND status = 'dead'",
+            (time.time(), job_id)
+        )
+
+    # results
+    def results(self) -> list:
+        """Jobs that have been extracted but not committed to the ledger yet.
+
+        Returns:
+            list: A list of (job_id, orders) tuples.
+        """
+        rows = self.__connection.execute("SELECT id, result FROM jobs WHERE status = 'done' ORDER BY id").fetchall()
+        return [(row["id"], json.loads(row["result"])) for row in rows]
+
+    # mark_committed
+    def mark_committed(self, job_ids: list) -> None:
+        """Marks jobs whose orders have been saved to the ledger.
+        """
+        now = time.time()
+        self.__connection.executemany(
+            "UPDATE jobs SET status = 'committed', result = NULL, updated = ? WHERE id = ? AND status = 'done'",
+            [(now, job_id) for job_id in job_ids]
+        )
+
+    # status
+    def status(self, job_id: int):
+        """Returns:
+            _type_: None if there is no such job else a dict with its "id", "filename", "user", "status", "attempts",
+            "error" and "flagged_pages".
+        """
+        row = self.__connection.execute(
+            "SELECT id, filename, user, status, attempts, error, flagged_pages FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        status = dict(row)
+        status["flagged_pages"] = json.loads(status["flagged_pages"] or "[]")
+        return status
+
+    # counts
+    def counts(self) -> dict:
+        """Number of jobs per status.
+        """
+        rows = self.__connection.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+    # dead_letters
+    def dead_letters(self) -> list:
+        """Jobs that have been given up on, with the last error of each.
+        """
+        rows = self.__connection.execute(
+            "SELECT id, filename, attempts, error FROM jobs WHERE status = 'dead' ORDER BY id"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    # pending
+    def pending(self) -> int:
+        """Number of jobs that are queued or being worked on.
+        """
+        row = self.__connection.execute(
+            "SELECT COUNT(*) AS count FROM jobs WHERE status IN ('queued', 'leased')"
+        ).fetchone()
+        return row["count"]
+
+
+# _lease_heartbeat
+@contextmanager
+def _lease_heartbeat(queue_filename: str, job_id: int, worker_id: str, lease_seconds: float):
+    """Renews the lease of a job from a background thread every third of lease_seconds while the block runs,
+    so a PDF taking longer than the lease isn't handed to another worker meanwhile.
+    """
+    stop = threading.Event()
+
+    def renew():
+        # sqlite connections can't be shared between threads, the heartbeat has its own
+        job_queue = JobQueue(filename=queue_filename)
+        try:
+            while not stop.wait(lease_seconds / 3):
+                try:
+                    if not job_queue.renew(job_id=job_id, worker_id=worker_id, lease_seconds=lease_seconds):
+                        # the lease has been lost, complete will drop the orders
+                        return
+                except sqlite3.Error:
+                    # the database is busy, trying again on the next beat
+                    continue
+        finally:
+            job_queue.close()
+
+    heartbeat = threading.Thread(target=renew, name=f"lease-{job_id}", daemon=True)
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        heartbeat.join()
+
+
+# run_worker
+def run_worker(queue_filename: str, worker_id: str = None, lease_seconds: float = 300,
+               poll_interval: float = 1.0, stop_when_empty: bool = True, page_timeout: float = None,
+               page_memory_mb: int = 512, logger=None) -> int:
+    """Pulls PDFs from the queue and extracts their orders until the queue is empty.
+    Meant to be the target of a worker process, see PDFAutomation.process_queue.
+
+    Args:
+        queue_filename (str): Name of the job queue database.
+        worker_id (str): Name of this worker in the leases, defaults to host:pid.
+        lease_seconds (float): How long a job is leased for without a heartbeat before another worker may take it over.
+        poll_interval (float): Seconds to wait before asking again when the queue is empty.
+        stop_when_empty (bool): If False, keeps waiting for new jobs forever.
+        page_timeout (float): If given, pages are extracted in isolation with this time budget, and page_memory_mb
+        of memory, so one bad page can't hang the worker. Pages over budget are listed in the job's flagged_pages.
+        logger (Logging): Log the flagged pages are written to. Worker processes can't share the log file of the
+        process that started them, PDFAutomation.commit_queue_results logs their flagged pages instead.
+
+    Returns:
+        int: Number of jobs completed by this worker.
+    """
+    if worker_id is None:
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    job_queue = JobQueue(filename=queue_filename)
+    completed = 0
+    try:
+        while True:
+            job = job_queue.claim(worker_id=worker_id, lease_seconds=lease_seconds)
+            if job is None:
+                if stop_when_empty:
+                    break
+                time.sleep(poll_interval)
+                continue
+            try:
+                with _lease_heartbeat(queue_filename, job["id"], worker_id, lease_seconds):
+                    pdf_handler = PDFHandler(filename=job["filename"], logger=logger)
+                    pdf_handler.open()
+                    if page_timeout is not None:
+                        orders = pdf_handler.fetch_order_details(o_type='web', user=job["user"], isolated=True,
+                                                                 page_timeout=page_timeout, page_memory_mb=page_memory_mb)
+                    else:
+                        orders = pdf_handler.fetch_order_details(o_type='web', user=job["user"])
+            except Exception as e:
+                job_queue.fail(job_id=job["id"], worker_id=worker_id, error=repr(e))
+                continue
+            if job_queue.complete(job_id=job["id"], worker_id=worker_id, orders=orders,
+                                  flagged_pages=pdf_handler.flagged_pages):
+                completed += 1
+    finally:
+        job_queue.close()
+    return completed
@@ -3,9 +3,14 @@
 # This is the core Python file for PDF Automation class
 
 # IMPORTS !!!
+import multiprocessing
+import os
+from concurrent.futures import Future
 from .handlers.pdf_handler import PDFHandler
 from .handlers.excel_handler import ExcelHandler
 from .handlers.gui_handler import GUI
+from .handlers.checkpoint_handler import CheckpointHandler
+from .job_queue import JobQueue, run_worker
 
 class PDFAutomation:
     """This class is reponsible for handling and organizing PDF Automation tasks of any type.
@@ -13,17 +18,28 @@ class PDFAutomation:
 
     # private data members
     __pypdf = None                                  # Object to contain pdf file, delete it afterwards
+    duplicate_orders: list = None                   # Order numbers of the last initialize that were already in the ledger
 
     # constructor
     def __init__(sedf):
         pass
 
     # initialize
-    def initialize(self, pdf_handler: PDFHandler, excel_handler: ExcelHandler):
+    def initialize(self, pdf_handler: PDFHandler, excel_handler: ExcelHandler, background_save: bool = False,
+                   checkpoint: CheckpointHandler = None, page_timeout: float = None, page_memory_mb: int = 512,
+                   show_duplicates: bool = True):
         """Initializes the automation task for this instance.
 
         Args:
             filename (str): Name of the PDF file to work on. It needs to be orders file not any other file.
+            background_save (bool): If True, the workbook is saved on a background thread and a Future
+            resolving to the status code is returned instead.
+            checkpoint (CheckpointHandler): If given, the extraction is checkpointed and resumed, and the orders
+            of a PDF are only committed to the ledger once.
+            page_timeout (float): If given, pages are extracted in isolation with this time budget, and
+            page_memory_mb of memory. Pages over budget are skipped and listed in pdf_handler.flagged_pages.
+            show_duplicates (bool): If False, orders already in the ledger aren't shown in a window, e.g. when
+            running off the Tk thread, they are left in duplicate_orders instead.
 
         Returns:
             _type_: _description_
@@ -43,17 +59,137 @@ class PDFAutomation:
         pdf_handler.open()
 
         # fetching order details from pdf
-        order_details = pdf_handler.fetch_order_details(o_type='web')
+        if page_timeout is not None:
+            order_details = pdf_handler.fetch_order_details(o_type='web', checkpoint=checkpoint, isolated=True,
+                                                            page_timeout=page_timeout, page_memory_mb=page_memory_mb)
+        else:
+            order_details = pdf_handler.fetch_order_details(o_type='web', checkpoint=checkpoint)
+
+        # nothing to do if the orders of this pdf have already been committed, will return 104 as its status code.
+        # the ledger may have been restored from an older generation or edited since, in which case the committed
+        # orders are written again, the ones still in the ledger are skipped as duplicates
+        if pdf_handler.already_committed and excel_handler.has_orders(order[0] for order in order_details):
+            self.duplicate_orders = []
+            if background_save:
+                done = Future()
+                done.set_result(104)
+                return done
+            return 104
 
         # writing the fetched order details on the Excel file
         wb = excel_handler.open_file(headers=["ORDER_DETAILS", "DATE", "TIME", "USER"], create_file=True)
 
         # writing data on the excel_file
-        excel_handler.write(wb.active, data=order_details)
-
-        # saving the workbook
+        self.duplicate_orders = excel_handler.write(wb.active, data=order_details, show_duplicates=show_duplicates)
+
+        # saving the workbook, the checkpoint is only marked as committed once the ledger is on the disk
+        if background_save:
+            save = excel_handler.save_in_background(wb)
+            if checkpoint is not None:
+                # only resolving once the checkpoint is marked, so the next run of the same pdf sees it
+                committed = Future()
+                save.add_done_callback(lambda f: self._mark_committed(f, committed, checkpoint, pdf_handler.file_hash))
+                return committed
+            return save
         code = excel_handler.save(wb)
+        if checkpoint is not None and code is None:
+            checkpoint.mark_committed(pdf_handler.file_hash)
+
+        return code
+
+    # _mark_committed
+    def _mark_committed(self, save: Future, committed: Future, checkpoint: CheckpointHandler, file_hash: str):
+        """Marks the checkpoint as committed once a background save has succeeded, then resolves committed
+        with the status code of the save. A crash before this point commits the orders again on the next run,
+        where they are skipped as duplicates.
+        """
+        try:
+            code = save.result()
+            if code is None:
+                checkpoint.mark_committed(file_hash)
+        except Exception as e:
+            committed.set_exception(e)
+            return
+        committed.set_result(code)
+
+    # process_queue
+    def process_queue(self, queue_filename: str, excel_handler: ExcelHandler, workers: int = None,
+                      commit_interval: float = 5.0, page_timeout: float = None, page_memory_mb: int = 512,
+                      logger=None) -> dict:
+        """Starts worker processes that extract the PDFs of the job queue, and commits their orders
+        to the ledger from this process only, so there is always a single ledger writer.
 
+        Args:
+            queue_filename (str): Name of the job queue database.
+            excel_handler (ExcelHandler): Handler of the ledger the orders are written to.
+            workers (int): Number of worker processes, defaults to the number of CPUs.
+            commit_interval (float): Seconds between two commits while the workers are running.
+            page_timeout (float): If given, the workers extract pages in isolation with this time budget,
+            and page_memory_mb of memory.
+            logger (Logging): Log the pages flagged by the workers are written to, as their orders are committed.
+
+        Returns:
+            dict: Number of jobs per status once the workers are done.
+        """
+        # validating excel_handler
+        assert type(excel_handler) == ExcelHandler, "excel_handler needs to be ExcelHandler"
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(queue_filename,), name=f"pdf-worker-{i}",
+                                    kwargs={"page_timeout": page_timeout, "page_memory_mb": page_memory_mb})
+            for i in range(workers)
+        ]
+        for process in processes:
+            process.start()
+
+        job_queue = JobQueue(filename=queue_filename)
+        try:
+            # committing what has been extracted so far while the workers keep going
+            while any(process.is_alive() for process in processes):
+                for process in processes:
+                    process.join(timeout=commit_interval / len(processes))
+                self.commit_queue_results(job_queue=job_queue, excel_handler=excel_handler, logger=logger)
+            self.commit_queue_results(job_queue=job_queue, excel_handler=excel_handler, logger=logger)
+            return job_queue.counts()
+        finally:
+            # if committing failed, e.g. the disk is full, the workers would keep the process from exiting;
+            # the jobs they were working on are handed out again once their leases expire
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+            for process in processes:
+                process.join()
+            job_queue.close()
+
+    # commit_queue_results
+    def commit_queue_results(self, job_queue: JobQueue, excel_handler: ExcelHandler, logger=None):
+        """Writes the orders of every extracted job to the ledger in one save, then marks the jobs as committed.
+        The pages the workers had to skip are written to the logger, if given.
+
+        Returns:
+            _type_: None, or 101 if the ledger is opened by some other program.
+        """
+        results = job_queue.results()
+        if not results:
+            return None
+
+        wb = excel_handler.open_file(headers=["ORDER_DETAILS", "DATE", "TIME", "USER"], create_file=True)
+        for job_id, orders in results:
+            excel_handler.write(wb.active, data=orders, show_duplicates=False)
+        # the atomic save reports a locked ledger with 101 instead of prompting, nobody may be at the screen
+        code = excel_handler.save_in_background(wb).result()
+        if code == 101:
+            # the jobs stay done, they are committed on the next call
+            return code
+        # a crash right here commits the orders again next time, where they are skipped as duplicates
+        job_queue.mark_committed([job_id for job_id, orders in results])
+        if logger is not None:
+            for job_id, orders in results:
+                job = job_queue.status(job_id)
+                for page_number, reason in job["flagged_pages"]:
+                    logger.write(f"[PDF_AUTOMATION] job={job_id} flagged page={page_number + 1} of {job['filename']}, reason={reason}\n")
         return code
 
     # run
@@ -0,0 +1,407 @@
+
+
+# This file contains the LedgerService class, a local service owning the ledger, and its ServiceClient
+
+# IMPORTS !!!
+import asyncio
+import atexit
+import json
+import multiprocessing
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from .handlers.excel_handler import ExcelHandler
+from .handlers.pdf_handler import PDFHandler
+from .job_queue import JobQueue, run_worker
+from .pdfa import PDFAutomation
+
+class LedgerService:
+    """A local asyncio HTTP service that owns the ledger, the job queue and a warm in memory index of the ledger.
+
+    Every desk talks to this one process instead of loading boltworld.xlsx over the shared drive itself.
+    The ledger is only read when it changes on the disk, repeated searches are answered from the index.
+
+    Endpoints:
+        POST /jobs              {"filename": "...", "user": "..."} -> {"id": 1}
+        GET  /jobs/<id>         -> {"id": 1, "filename": "...", "user": "...", "status": "queued", "attempts": 0,
+                                    "error": null, "flagged_pages": []}
+        GET  /search?type=order&value=12345 -> {"status": 100, "results": [[12345, "19-01-2026", "10:30 AM", "user"]]}
+        GET  /health            -> {"status": "ok", "records": 0, "jobs": {...}, "commit_error": null}
+        GET  /stats             -> {"enabled": true, "per_date": [["19-01-2026", 3]], "per_user": [["user", 3]],
+                                    "per_date_user": [["19-01-2026", "user", 3]]}
+
+    Stats come from the rollups of the service's ledger, "enabled" is false unless ROLLUP_FILE is set for it.
+
+    Health is "error" while the last commit of extracted orders to the ledger has failed, commit_error says why.
+
+    Search statuses are the same as ExcelHandler.search, 100 found, 103 not found and 102 no ledger yet.
+    """
+
+    __excel_handler: ExcelHandler = None        # Handler of the ledger, only used from the ledger thread
+    __queue_filename: str = None                # Name of the job queue database
+    __workers: int = 1                          # Number of worker processes extracting queued PDFs
+    __commit_interval: float = 2.0              # Seconds between two commits of extracted orders to the ledger
+    __cache_size: int = 256                     # Number of search results kept per version of the ledger
+    __page_timeout: float = 30.0                # Time budget of one PDF page in the worker processes
+    __page_memory_mb: int = 512                 # Memory budget of the page extraction of a worker
+    __logger = None                             # Logger object
+
+    # constructor
+    def __init__(self, excel_handler: ExcelHandler, queue_filename: str, workers: int = None,
+                 commit_interval: float = 2.0, cache_size: int = 256, page_timeout: float = 30.0,
+                 page_memory_mb: int = 512, logger=None) -> None:
+        """Initialize a LedgerService instance.
+
+        Args:
+            excel_handler (ExcelHandler): Handler of the ledger owned by the service.
+            queue_filename (str): Name of the job queue database submitted PDFs are added to.
+            workers (int): Number of worker processes extracting queued PDFs, defaults to the number of CPUs.
+            commit_interval (float): Seconds between two commits of extracted orders to the ledger.
+            cache_size (int): Number of search results kept until the ledger changes.
+            page_timeout (float): Time budget of one PDF page, the workers run for as long as the service does,
+            so pages are always extracted in isolation and one bad page can't hang a worker.
+            page_memory_mb (int): Memory budget of the page extraction.
+        """
+        # Validations!
+        assert type(excel_handler) == ExcelHandler, "excel_handler needs to be ExcelHandler"
+        assert type(queue_filename) == str, "queue_filename needs to be string"
+        assert queue_filename != "", "queue_filename cannot be none"
+
+        # initializing
+        self.__excel_handler = excel_handler
+        self.__queue_filename = queue_filename
+        self.__workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.__commit_interval = commit_interval
+        self.__cache_size = cache_size
+        self.__page_timeout = page_timeout
+        self.__page_memory_mb = page_memory_mb
+        self.__logger = logger
+        self.__commit_error = None              # repr of the exception of the last commit, None once one succeeds
+        self.__ledger_filename = excel_handler.filename
+        self.__records = None                   # OrderRecordStore of the ledger, the warm index
+        self.__records_mtime = None             # mtime of the ledger the index was loaded from
+        self.__records_task = None              # running reload of the index, shared by concurrent searches
+        self.__cache = OrderedDict()            # (type, value) -> search result, for the current index
+        # the ledger, the job queue connection and the index reloads all live on one thread
+        self.__ledger_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ledger")
+        self.__search_executor = ThreadPoolExecutor(thread_name_prefix="search")
+        self.__job_queue = None
+        self.__processes = []
+
+    # serve
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765):
+        """Runs the service until it is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        self.__job_queue = await loop.run_in_executor(self.__ledger_executor, JobQueue, self.__queue_filename)
+        self._start_workers()
+        commits = asyncio.create_task(self._commit_loop())
+        server = await asyncio.start_server(self._handle, host=host, port=port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            commits.cancel()
+            try:
+                await commits
+            except asyncio.CancelledError:
+                pass
+            self._stop_workers()
+            await loop.run_in_executor(self.__ledger_executor, self.__job_queue.close)
+            self.__ledger_executor.shutdown(wait=True)
+            self.__search_executor.shutdown(wait=False)
+
+    # run
+    def run(self, host: str = "127.0.0.1", port: int = 8765):
+        """Blocking entry point, see serve.
+        """
+        try:
+            asyncio.run(self.serve(host=host, port=port))
+        except KeyboardInterrupt:
+            pass
+
+    # _start_workers
+    def _start_workers(self):
+        # not daemonic, the isolated page extraction starts a child process of its own, which daemons can't.
+        # atexit handlers run last registered first, so this stops them before multiprocessing joins them
+        atexit.register(self._stop_workers)
+        for i in range(self.__workers):
+            process = multiprocessing.Process(
+                target=run_worker,
+                args=(self.__queue_filename,),
+                kwargs={"stop_when_empty": False, "page_timeout": self.__page_timeout,
+                        "page_memory_mb": self.__page_memory_mb},
+                name=f"pdf-worker-{i}"
+            )
+            process.start()
+            self.__processes.append(process)
+
+    # _stop_workers
+    def _stop_workers(self):
+        atexit.unregister(self._stop_workers)
+        for process in self.__processes:
+            process.terminate()
+        for process in self.__processes:
+            process.join()
+        self.__processes = []
+
+    # _commit_loop
+    async def _commit_loop(self):
+        """Commits extracted orders to the ledger from the ledger thread, so there is a single ledger writer.
+        A failed commit is reported by /health and tried again on the next round.
+        """
+        loop = asyncio.get_running_loop()
+        pdf_automation = PDFAutomation()
+        while True:
+            await asyncio.sleep(self.__commit_interval)
+            try:
+                await loop.run_in_executor(
+                    self.__ledger_executor, pdf_automation.commit_queue_results, self.__job_queue, self.__excel_handler,
+                    self.__logger
+                )
+            except Exception as e:
+                if self.__commit_error != repr(e) and self.__logger is not None:
+                    self.__logger.write(f"[LEDGER_SERVICE] committing extracted orders failed, {e!r}\n")
+                self.__commit_error = repr(e)
+                continue
+            self.__commit_error = None
+
+    # _handle
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Reads one HTTP request, routes it and writes a JSON response.
+        """
+        try:
+            request_line = await reader.readline()
+            if not request_line:
+                return
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get('content-length', 0)))
+            status, payload = await self._route(method, target, body)
+        except Exception as e:
+            status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": repr(e)}
+
+        data = json.dumps(payload).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    # _route
+    async def _route(self, method: str, target: str, body: bytes):
+        url = urllib.parse.urlsplit(target)
+        path = url.path.rstrip('/')
+        loop = asyncio.get_running_loop()
+
+        if method == 'GET' and path == '/search':
+            query = urllib.parse.parse_qs(url.query)
+            _type = query.get('type', [''])[0]
+            value = query.get('value', [''])[0]
+            if _type not in ('order', 'date', 'user') or value == '':
+                return HTTPStatus.BAD_REQUEST, {"error": "type needs to be order, date or user and value cannot be empty"}
+            return HTTPStatus.OK, await self._search(_type, value)
+
+        if method == 'POST' and path == '/jobs':
+            request = json.loads(body or b'{}')
+            filename = request.get('filename')
+            if not isinstance(filename, str) or not filename:
+                return HTTPStatus.BAD_REQUEST, {"error": "filename cannot be empty"}
+            if not os.path.exists(filename):
+                return HTTPStatus.BAD_REQUEST, {"error": f"{filename} doesn't exist on the service host"}
+            # the orders are credited to the user at the desk, not to the account running the service
+            user = request.get('user')
+            if user is not None and (not isinstance(user, str) or not user):
+                return HTTPStatus.BAD_REQUEST, {"error": "user needs to be a non-empty string"}
+            job_id = await loop.run_in_executor(self.__ledger_executor, self.__job_queue.submit, filename, user)
+            return HTTPStatus.ACCEPTED, {"id": job_id}
+
+        if method == 'GET' and path.startswith('/jobs/'):
+            try:
+                job_id = int(path[len('/jobs/'):])
+            except ValueError:
+                return HTTPStatus.BAD_REQUEST, {"error": "job id needs to be an integer"}
+            status = await loop.run_in_executor(self.__ledger_executor, self.__job_queue.status, job_id)
+            if status is None:
+                return HTTPStatus.NOT_FOUND, {"error": f"no job {job_id}"}
+            return HTTPStatus.OK, status
+
+        if method == 'GET' and path == '/health':
+            counts = await loop.run_in_executor(self.__ledger_executor, self.__job_queue.counts)
+            records = len(self.__records) if self.__records is not None else 0
+            return HTTPStatus.OK, {
+                "status": "ok" if self.__commit_error is None else "error",
+                "records": records,
+                "jobs": counts,
+                "commit_error": self.__commit_error,
+            }
+
+        if method == 'GET' and path == '/stats':
+            return HTTPStatus.OK, await loop.run_in_executor(self.__ledger_executor, self._stats)
+
+        return HTTPStatus.NOT_FOUND, {"error": f"no route for {method} {url.path}"}
+
+    # _stats
+    def _stats(self) -> dict:
+        """Order counts of the rollups, runs on the ledger thread.
+        """
+        rollups = self.__excel_handler.get_rollups()
+        if rollups is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "per_date": rollups.per_date(),
+            "per_user": rollups.per_user(),
+            "per_date_user": rollups.per_date_user(),
+        }
+
+    # _search
+    async def _search(self, _type: str, value: str) -> dict:
+        """Searches the warm index, reloading it first if the ledger has changed on the disk.
+        """
+        records = await self._current_records()
+        if records is None:
+            return {"status": 102, "results": []}
+
+        key = (_type, value)
+        if key in self.__cache:
+            self.__cache.move_to_end(key)
+            return self.__cache[key]
+
+        loop = asyncio.get_running_loop()
+        # searching the index off the event loop, so other requests keep being served meanwhile
+        results = await loop.run_in_executor(self.__search_executor, lambda: list(records.search(_type, value)))
+        response = {"status": 100 if results else 103, "results": results}
+        # the index may have been reloaded while searching, only caching results of the current one
+        if records is self.__records:
+            self.__cache[key] = response
+            if len(self.__cache) > self.__cache_size:
+                self.__cache.popitem(last=False)
+        return response
+
+    # _current_records
+    async def _current_records(self):
+        """Returns:
+            _type_: None if the ledger doesn't exist yet else the OrderRecordStore of the ledger as it is on the disk.
+        """
+        try:
+            mtime = os.path.getmtime(self.__ledger_filename)
+        except FileNotFoundError:
+            return None
+        if self.__records is not None and mtime == self.__records_mtime:
+            return self.__records
+
+        # concurrent searches wait on the same reload instead of parsing the ledger once each
+        if self.__records_task is None:
+            self.__records_task = asyncio.create_task(self._reload_records(mtime))
+        task = self.__records_task
+        try:
+            return await asyncio.shield(task)
+        finally:
+            if self.__records_task is task and task.done():
+                self.__records_task = None
+
+    # _reload_records
+    async def _reload_records(self, mtime: float):
+        loop = asyncio.get_running_loop()
+        records = await loop.run_in_executor(self.__ledger_executor, self.__excel_handler.load_records)
+        if records == 102:
+            return None
+        self.__records = records
+        self.__records_mtime = mtime
+        self.__cache.clear()
+        return records
+
+
+class ServiceClient:
+    """Talks to a LedgerService, so that the GUI can work as a thin client of it.
+    """
+
+    __url: str = None                           # Base url of the service, e.g. http://127.0.0.1:8765
+    __timeout: float = 30.0                     # Seconds to wait for a response
+
+    # constructor
+    def __init__(self, url: str, timeout: float = 30.0) -> None:
+        # Validations!
+        assert type(url) == str, "url needs to be string"
+        assert url != "", "url cannot be none"
+
+        # initializing
+        self.__url = url.rstrip('/')
+        self.__timeout = timeout
+
+    # _request
+    def _request(self, method: str, path: str, payload: dict = None) -> dict:
+        data = json.dumps(payload).encode() if payload is not None else None
+        request = urllib.request.Request(self.__url + path, data=data, method=method)
+        if data is not None:
+            request.add_header('Content-Type', 'application/json')
+        try:
+            with urllib.request.urlopen(request, timeout=self.__timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            # the service explains what went wrong in the body
+            message = json.loads(e.read() or b'{}').get('error', str(e))
+            raise RuntimeError(f"Service error: {message}") from None
+
+    # submit
+    def submit(self, filename: str, user: str = None) -> int:
+        """Adds a PDF to the service's job queue. The path needs to be readable by the service host.
+
+        Args:
+            filename (str): Name of the PDF.
+            user (str): Username the orders are credited to, defaults to the user running this client.
+
+        Returns:
+            int: Id of the new job.
+        """
+        if user is None:
+            user = PDFHandler.current_user()
+        return self._request('POST', '/jobs', {"filename": os.path.abspath(filename), "user": user})["id"]
+
+    # status
+    def status(self, job_id: int) -> dict:
+        """Returns:
+            dict: "id", "filename", "user", "status", "attempts", "error" and "flagged_pages" of the job.
+        """
+        return self._request('GET', f'/jobs/{int(job_id)}')
+
+    # health
+    def health(self) -> dict:
+        """Returns:
+            dict: "status", "records", "jobs" and "commit_error" of the service.
+        """
+        return self._request('GET', '/health')
+
+    # stats
+    def stats(self) -> dict:
+        """Returns:
+            dict: "enabled", and if it is, the "per_date", "per_user" and "per_date_user" rows of the service's rollups.
+        """
+        return self._request('GET', '/stats')
+
+    # search
+    def search(self, _type: str, search_value: str):
+        """Same as ExcelHandler.search, answered by the service.
+
+        Returns:
+            tuple: (status_code, results)
+        """
+        query = urllib.parse.urlencode({"type": _type, "value": search_value})
+        response = self._request('GET', f'/search?{query}')
+        return (response["status"], response["results"])
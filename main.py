@@ -2,12 +2,30 @@
 from PDF_Automation import GUI, ExcelHandler
 from PDF_Automation import PDFAutomation
 from PDF_Automation.logging import Logging
+from PDF_Automation import JobQueue, CheckpointHandler, LedgerService, ServiceClient, ParquetArchive
+from PDF_Automation import FederatedSearch
+import argparse
 import os
 from dotenv import load_dotenv
 
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PDF Order Extraction System")
+    parser.add_argument("--queue", help="job queue database, runs without the GUI, e.g. jobs.db. QUEUE_JOURNAL_MODE=WAL "
+                        "speeds it up when every worker runs on this machine, keep the default on a network drive")
+    parser.add_argument("--submit", nargs="*", default=[], help="PDF files to add to the job queue")
+    parser.add_argument("--workers", type=int, default=0, help="number of worker processes extracting the queued PDFs")
+    parser.add_argument("--rebuild-rollups", action="store_true", help="recount the order statistics from the ledger and exit")
+    parser.add_argument("--migrate", nargs="*", metavar="XLSX", help="copy xlsx ledgers, boltworld.xlsx if none are given, "
+                        "into the parquet archive set by PARQUET_ARCHIVE and exit")
+    parser.add_argument("--forget-checkpoint", nargs="+", metavar="PDF", help="forget the checkpoints of PDFs, so that "
+                        "they are extracted and committed again on the next run, and exit")
+    parser.add_argument("--serve", action="store_true", help="run the local ledger service instead of the GUI")
+    parser.add_argument("--host", default="127.0.0.1", help="address the ledger service listens on")
+    parser.add_argument("--port", type=int, default=8765, help="port the ledger service listens on")
+    args = parser.parse_args()
+
     base_dir = os.path.dirname(os.path.abspath(__file__))
     env_path = os.path.join(base_dir, ".env")
     png_path = os.path.join(base_dir, "zms_logo.png")
@@ -22,9 +40,100 @@ if __name__ == "__main__":
 
     # Excel Handler
     excel_handler = ExcelHandler(logger=logger, filename="boltworld.xlsx")
-    # GUI component
-    gui_handler = GUI(png=png_path, ico=icon_path, excel_handler=excel_handler)
-    
+    # Bloom filter for duplicate checks against the ledger and its archives
+    bloom_filename = os.getenv("BLOOM_FILE")
+    if bloom_filename:
+        archive_filenames = [name for name in os.getenv("ARCHIVE_FILES", "").split(os.pathsep) if name]
+        excel_handler.configure_duplicate_filter(
+            bloom_filename=bloom_filename,
+            archive_filenames=archive_filenames,
+            capacity=int(os.getenv("BLOOM_CAPACITY", "1000000")),
+            error_rate=float(os.getenv("BLOOM_ERROR_RATE", "0.001"))
+        )
+    # Order statistics, kept up to date on every write
+    rollup_filename = os.getenv("ROLLUP_FILE")
+    if rollup_filename:
+        excel_handler.configure_rollups(filename=rollup_filename)
+    if args.rebuild_rollups:
+        if not rollup_filename:
+            parser.error("--rebuild-rollups needs ROLLUP_FILE to be set")
+        excel_handler.rebuild_rollups()
+        raise SystemExit(0)
+
+    # Columnar archive, kept in sync on every save and used for searches
+    archive_directory = os.getenv("PARQUET_ARCHIVE")
+    if args.migrate is not None:
+        if not archive_directory:
+            parser.error("--migrate needs PARQUET_ARCHIVE to be set")
+        archive = ParquetArchive(directory=archive_directory)
+        for filename in args.migrate or [excel_handler.filename]:
+            print(f"Migrated {archive.migrate_from_xlsx(filename)} rows from {filename}")
+        raise SystemExit(0)
+    if archive_directory:
+        archive = ParquetArchive(directory=archive_directory)
+        # catching up with rows added in Excel or by desks without the archive, searches read the xlsx file until then
+        if os.path.exists(excel_handler.filename) and not archive.is_migrated(excel_handler.filename):
+            print(f"Migrated {archive.migrate_from_xlsx(excel_handler.filename)} rows from {excel_handler.filename}")
+        excel_handler.add_backend(archive, use_for_search=True)
+
     # PDF Automation object
     pdf_automation = PDFAutomation()
+
+    # Per page time and memory budget, pages are extracted in isolation if PAGE_TIMEOUT is set
+    page_timeout = float(os.getenv("PAGE_TIMEOUT")) if os.getenv("PAGE_TIMEOUT") else None
+    page_memory_mb = int(os.getenv("PAGE_MEMORY_MB", "512"))
+
+    if args.serve:
+        # Ledger service, every GUI pointed at it with SERVICE_URL shares its warm index
+        service = LedgerService(
+            excel_handler=excel_handler,
+            queue_filename=args.queue or os.getenv("QUEUE_FILE", "jobs.db"),
+            workers=args.workers or None,
+            # the service's workers always extract pages in isolation, a bad page can't hang them for good
+            page_timeout=page_timeout or 30.0,
+            page_memory_mb=page_memory_mb,
+            logger=logger
+        )
+        print(f"Serving on http://{args.host}:{args.port}")
+        service.run(host=args.host, port=args.port)
+        raise SystemExit(0)
+
+    if args.queue:
+        # Job queue, PDFs are extracted by worker processes and written to the ledger from here
+        job_queue = JobQueue(filename=args.queue)
+        for filename in args.submit:
+            print(f"Submitted job {job_queue.submit(filename)}: {filename}")
+        job_queue.close()
+        if args.workers > 0:
+            counts = pdf_automation.process_queue(queue_filename=args.queue, excel_handler=excel_handler, workers=args.workers,
+                                                  page_timeout=page_timeout, page_memory_mb=page_memory_mb, logger=logger)
+            print(f"Jobs: {counts}")
+        raise SystemExit(0)
+
+    # Checkpoints, so that an interrupted PDF resumes from its last completed page
+    checkpoint_handler = CheckpointHandler(directory=os.getenv("CHECKPOINT_DIR", os.path.join(base_dir, ".checkpoints")))
+    if args.forget_checkpoint:
+        for filename in args.forget_checkpoint:
+            checkpoint_handler.remove(checkpoint_handler.file_hash(filename))
+            print(f"Forgot the checkpoint of {filename}")
+        raise SystemExit(0)
+
+    # Federated search, searches the ledger together with the ones listed in LEDGER_FILES, e.g. yearly archives
+    federated_search = None
+    ledger_filenames = [name for name in os.getenv("LEDGER_FILES", "").split(os.pathsep) if name]
+    if ledger_filenames:
+        federated_search = FederatedSearch(
+            filenames=[excel_handler.filename] + ledger_filenames,
+            metadata_filename=os.getenv("LEDGER_METADATA", os.path.join(base_dir, "ledgers.meta.json")),
+            logger=logger
+        )
+    max_results = int(os.getenv("SEARCH_MAX_RESULTS")) if os.getenv("SEARCH_MAX_RESULTS") else None
+
+    # GUI component
+    gui_handler = GUI(png=png_path, ico=icon_path, excel_handler=excel_handler, checkpoint_handler=checkpoint_handler,
+                      logger=logger, page_timeout=page_timeout, page_memory_mb=page_memory_mb,
+                      service_client=ServiceClient(url=os.getenv("SERVICE_URL")) if os.getenv("SERVICE_URL") else None,
+                      federated_search=federated_search, max_results=max_results)
     pdf_automation.run(gui_handler=gui_handler)
+    if federated_search is not None:
+        federated_search.close()
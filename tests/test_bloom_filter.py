@@ -0,0 +1,56 @@
+
+# Tests of BloomFilter
+
+# IMPORTS!
+import pytest
+from PDF_Automation import BloomFilter
+
+
+def test_added_order_numbers_are_found():
+    bloom = BloomFilter(capacity=10_000, error_rate=0.01)
+    bloom.update(range(10_000))
+    assert all(order_number in bloom for order_number in range(10_000))
+    false_positives = sum(order_number in bloom for order_number in range(10_000, 30_000))
+    assert false_positives / 20_000 < 0.02
+
+
+def test_save_and_load(tmp_path):
+    filename = str(tmp_path / "orders.bloom")
+    bloom = BloomFilter(capacity=1000, error_rate=0.001)
+    bloom.update([1, 2, "ABC-1"])
+    version = bloom.save(filename)
+    assert version == BloomFilter.file_version(filename)
+
+    loaded = BloomFilter.load(filename)
+    assert (loaded.bits, loaded.hashes, loaded.count) == (bloom.bits, bloom.hashes, 3)
+    assert 1 in loaded and "ABC-1" in loaded and 3 not in loaded
+
+
+def test_save_with_merge_keeps_the_bits_in_the_file(tmp_path):
+    filename = str(tmp_path / "orders.bloom")
+    first = BloomFilter(capacity=1000)
+    second = BloomFilter(capacity=1000)
+    first.add(555)
+    first.save(filename)
+    second.add(777)
+    second.save(filename, merge=True)
+
+    loaded = BloomFilter.load(filename)
+    assert 555 in loaded and 777 in loaded
+    assert 555 in second
+
+
+def test_version_changes_when_the_file_is_replaced(tmp_path):
+    filename = str(tmp_path / "orders.bloom")
+    assert BloomFilter.file_version(filename) is None
+    bloom = BloomFilter(capacity=1000)
+    first = bloom.save(filename)
+    bloom.add(1)
+    assert bloom.save(filename) != first
+
+
+def test_load_rejects_other_files(tmp_path):
+    filename = tmp_path / "not.bloom"
+    filename.write_bytes(b"\0" * 64)
+    with pytest.raises(AssertionError):
+        BloomFilter.load(str(filename))
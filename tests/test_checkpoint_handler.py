@@ -0,0 +1,72 @@
+
+# Tests of CheckpointHandler and resuming PDFHandler from it
+
+# IMPORTS!
+import pytest
+from conftest import make_pdf
+from PDF_Automation import CheckpointHandler, ExcelHandler, PDFAutomation, PDFHandler
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    return CheckpointHandler(directory=str(tmp_path / "checkpoints"))
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    filename = str(tmp_path / "orders.pdf")
+    make_pdf(filename, [f"Order Number: {1000 + page}" for page in range(4)])
+    return filename
+
+
+def test_save_and_load(checkpoint):
+    checkpoint.save("abc", o_type="web", next_page=2, orders=[(1, "d", "t", "u")], flagged_pages=[(1, "timeout")])
+    assert checkpoint.load("abc") == {
+        "o_type": "web", "next_page": 2, "orders": [[1, "d", "t", "u"]], "committed": False,
+        "flagged_pages": [[1, "timeout"]],
+    }
+    assert checkpoint.load("missing") is None
+
+
+def test_mark_committed_keeps_the_orders(checkpoint):
+    checkpoint.save("abc", o_type="web", next_page=2, orders=[[1, "d", "t", "u"]])
+    checkpoint.mark_committed("abc")
+    state = checkpoint.load("abc")
+    assert state["committed"] and state["orders"] == [[1, "d", "t", "u"]]
+    checkpoint.remove("abc")
+    assert checkpoint.load("abc") is None
+
+
+def test_extraction_resumes_from_the_checkpoint(checkpoint, pdf):
+    file_hash = checkpoint.file_hash(pdf)
+    # the first two pages were extracted by an earlier, interrupted run
+    checkpoint.save(file_hash, o_type="web", next_page=2, orders=[[1, "01-01-2026", "10:00 AM", "earlier"]])
+
+    pdf_handler = PDFHandler(filename=pdf)
+    pdf_handler.open()
+    orders = pdf_handler.fetch_order_details(o_type="web", checkpoint=checkpoint, user="tester")
+    assert [order[0] for order in orders] == [1, 1002, 1003]
+    assert not pdf_handler.already_committed
+    assert checkpoint.load(file_hash)["next_page"] == 4
+
+
+def test_committed_pdf_is_not_read_again(checkpoint, pdf):
+    pdf_handler = PDFHandler(filename=pdf)
+    pdf_handler.open()
+    orders = pdf_handler.fetch_order_details(o_type="web", checkpoint=checkpoint, user="tester")
+    checkpoint.mark_committed(pdf_handler.file_hash)
+
+    again = PDFHandler(filename=pdf)
+    again.open()
+    assert again.fetch_order_details(o_type="web", checkpoint=checkpoint, user="tester") == orders
+    assert again.already_committed
+
+
+def test_committed_pdf_without_orders_is_not_read_again(logger, checkpoint, tmp_path):
+    filename = str(tmp_path / "empty.pdf")
+    make_pdf(filename, ["No orders here", "Nor here"])
+    excel_handler = ExcelHandler(logger=logger, filename=str(tmp_path / "boltworld.xlsx"))
+    assert PDFAutomation().initialize(PDFHandler(filename=filename), excel_handler, checkpoint=checkpoint,
+                                      show_duplicates=False) is None
+    assert PDFAutomation().initialize(PDFHandler(filename=filename), excel_handler, checkpoint=checkpoint,
+                                      show_duplicates=False) == 104
@@ -0,0 +1,179 @@
+
+# Tests of ExcelHandler duplicate checks, background saves and generations
+
+# IMPORTS!
+import datetime
+import os
+import openpyxl
+import pytest
+from PDF_Automation import ExcelHandler, RollupHandler
+
+HEADERS = ["ORDER_DETAILS", "DATE", "TIME", "USER"]
+
+
+def order(order_number, user="u"):
+    return [order_number, "01-01-2026", "10:00 AM", user]
+
+
+def ledger_orders(filename):
+    wb = openpyxl.load_workbook(filename, read_only=True)
+    try:
+        return [row[0] for row in wb.active.iter_rows(min_row=2, values_only=True)]
+    finally:
+        wb.close()
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return str(tmp_path / "boltworld.xlsx")
+
+
+def disk_full(self, filename):
+    raise OSError(28, "No space left on device")
+
+
+def write_and_save(excel_handler, orders):
+    wb = excel_handler.open_file(headers=HEADERS, create_file=True)
+    duplicates = excel_handler.write(wb.active, data=orders, show_duplicates=False)
+    assert excel_handler.save_in_background(wb).result() is None
+    return duplicates
+
+
+def test_write_skips_orders_already_in_the_ledger(logger, ledger):
+    excel_handler = ExcelHandler(logger=logger, filename=ledger)
+    assert write_and_save(excel_handler, [order(1), order(2)]) == []
+    assert write_and_save(excel_handler, [order(2), order(3)]) == [2]
+    assert ledger_orders(ledger) == [1, 2, 3]
+
+def test_write_skips_the_same_order_twice_in_one_batch(logger, ledger):
+    excel_handler = ExcelHandler(logger=logger, filename=ledger)
+    assert write_and_save(excel_handler, [order(777), order(777)]) == [777]
+    assert ledger_orders(ledger) == [777]
+
+def test_hand_edited_cells_dont_break_the_duplicate_check(logger, ledger):
+    wb = openpyxl.Workbook()
+    wb.active.append(HEADERS)
+    wb.active.append(["ABC-1", "01-01-2026", "10:00 AM", "u"])
+    wb.active.append([5, "2026-01-01", datetime.time(9, 30), "u"])
+    wb.save(ledger)
+
+    excel_handler = ExcelHandler(logger=logger, filename=ledger)
+    assert write_and_save(excel_handler, [order("ABC-1"), order(5), order(6)]) == ["ABC-1", 5]
+    records = excel_handler.load_records()
+    assert len(records) == 3 and "ABC-1" in records and 6 in records
+
+def test_handlers_sharing_a_bloom_file_see_each_others_orders(logger, ledger, tmp_path):
+    bloom_filename = str(tmp_path / "boltworld.bloom")
+    first = ExcelHandler(logger=logger, filename=ledger)
+    second = ExcelHandler(logger=logger, filename=ledger)
+    first.configure_duplicate_filter(bloom_filename, capacity=10_000)
+    second.configure_duplicate_filter(bloom_filename, capacity=10_000)
+
+    write_and_save(first, [order(555)])
+    assert write_and_save(second, [order(555), order(556)]) == [555]
+    assert write_and_save(first, [order(556)]) == [556]
+    assert ledger_orders(ledger) == [555, 556]
+
+def test_background_saves_keep_generations(logger, ledger):
+    excel_handler = ExcelHandler(logger=logger, filename=ledger, generations=2)
+    for order_number in range(1, 5):
+        write_and_save(excel_handler, [order(order_number)])
+
+    generations = excel_handler.generations()
+    assert [name.rsplit(".", 2)[1] for name in generations] == ["1", "2"]
+    assert ledger_orders(generations[0]) == [1, 2, 3]
+    assert ledger_orders(generations[1]) == [1, 2]
+    assert ledger_orders(ledger) == [1, 2, 3, 4]
+
+def test_denied_saves_keep_the_generations(logger, ledger, monkeypatch):
+    excel_handler = ExcelHandler(logger=logger, filename=ledger, generations=3)
+    for order_number in range(1, 5):
+        write_and_save(excel_handler, [order(order_number)])
+    history = [ledger_orders(name) for name in excel_handler.generations()]
+
+    # Excel holding the ledger makes the rename over it fail
+    replace = os.replace
+
+    def locked(source, destination):
+        if destination == ledger:
+            raise PermissionError(13, "Permission denied")
+        replace(source, destination)
+    monkeypatch.setattr(os, "replace", locked)
+    for order_number in range(5, 8):
+        wb = excel_handler.open_file(headers=HEADERS, create_file=True)
+        excel_handler.write(wb.active, data=[order(order_number)], show_duplicates=False)
+        assert excel_handler.save_in_background(wb).result() == 101
+    monkeypatch.undo()
+
+    assert [ledger_orders(name) for name in excel_handler.generations()] == history == [[1, 2, 3], [1, 2], [1]]
+    assert ledger_orders(ledger) == [1, 2, 3, 4]
+    assert not [name for name in os.listdir(os.path.dirname(ledger)) if name.startswith(".")]
+
+def test_background_saves_keep_formatting(logger, ledger):
+    excel_handler = ExcelHandler(logger=logger, filename=ledger)
+    wb = excel_handler.open_file(headers=HEADERS, create_file=True)
+    wb.active.column_dimensions["A"].width = 33
+    wb.active["A1"].font = openpyxl.styles.Font(bold=True)
+    assert excel_handler.save_in_background(wb).result() is None
+
+    ws = excel_handler.open_file(headers=HEADERS, create_file=True).active
+    assert ws.column_dimensions["A"].width == 33 and ws["A1"].font.b
+
+def test_failed_save_is_not_raised_again(logger, ledger, monkeypatch):
+    excel_handler = ExcelHandler(logger=logger, filename=ledger)
+    write_and_save(excel_handler, [order(1)])
+
+    wb = excel_handler.open_file(headers=HEADERS, create_file=True)
+    excel_handler.write(wb.active, data=[order(2)], show_duplicates=False)
+    monkeypatch.setattr(openpyxl.Workbook, "save", disk_full)
+    with pytest.raises(OSError):
+        excel_handler.save_in_background(wb).result()
+    monkeypatch.undo()
+
+    # the failure is only logged from here on
+    assert excel_handler.wait_for_save() is None
+    assert ledger_orders(ledger) == [1]
+
+def test_failed_save_reverts_the_rollups(logger, ledger, tmp_path, monkeypatch):
+    excel_handler = ExcelHandler(logger=logger, filename=ledger)
+    excel_handler.configure_rollups(str(tmp_path / "rollups.json"))
+    write_and_save(excel_handler, [order(1, user="alice")])
+
+    wb = excel_handler.open_file(headers=HEADERS, create_file=True)
+    excel_handler.write(wb.active, data=[order(2, user="bob")], show_duplicates=False)
+    monkeypatch.setattr(openpyxl.Workbook, "save", disk_full)
+    with pytest.raises(OSError):
+        excel_handler.save_in_background(wb).result()
+    monkeypatch.undo()
+
+    excel_handler.wait_for_save()
+    assert excel_handler.get_rollups().by_user == {"alice": 1}
+
+
+def test_rollups_count_dates_excel_stored_as_datetime(logger, ledger, tmp_path):
+    wb = openpyxl.Workbook()
+    wb.active.append(HEADERS)
+    wb.active.append([1, datetime.datetime(2026, 1, 2), "10:00 AM", "alice"])
+    wb.active.append([2, "02-01-2026", "10:00 AM", 7])
+    wb.save(ledger)
+
+    excel_handler = ExcelHandler(logger=logger, filename=ledger)
+    excel_handler.configure_rollups(str(tmp_path / "rollups.json"))
+    write_and_save(excel_handler, [[3, datetime.date(2026, 1, 3), "10:00 AM", "alice"]])
+    rollups = excel_handler.get_rollups()
+    assert rollups.per_date() == [("02-01-2026", 2), ("03-01-2026", 1)]
+    assert rollups.by_user == {"alice": 2, "7": 1}
+
+
+def test_handlers_sharing_a_ledger_keep_each_others_rollups(logger, ledger, tmp_path):
+    rollup_filename = str(tmp_path / "rollups.json")
+    first = ExcelHandler(logger=logger, filename=ledger)
+    second = ExcelHandler(logger=logger, filename=ledger)
+    first.configure_rollups(rollup_filename)
+    second.configure_rollups(rollup_filename)
+
+    write_and_save(first, [order(1, user="alice"), order(2, user="alice")])
+    write_and_save(second, [order(3, user="bob")])
+    assert second.get_rollups().by_user == {"alice": 2, "bob": 1}
+    assert first.get_rollups().by_user == {"alice": 2, "bob": 1}
+    assert RollupHandler(filename=rollup_filename).by_user == {"alice": 2, "bob": 1}
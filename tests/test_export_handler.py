@@ -0,0 +1,33 @@
+
+# Tests of ExportHandler and the generated index ranges it exports
+
+# IMPORTS!
+import csv
+import pytest
+from PDF_Automation import ExcelHandler, ExportHandler
+
+ROWS = [[1, "01-01-2026", "10:00 AM", "alice"], ["ABC-1", "01-01-2026", "11:00 AM", "bob"], [2, "02-01-2026", None, "bob"]]
+
+
+def test_csv_export_streams_every_row(logger, tmp_path):
+    filename = str(tmp_path / "orders.csv")
+    assert ExportHandler(logger=logger).export(iter(ROWS), filename) == 3
+    with open(filename, newline='', encoding='utf-8') as file:
+        assert [row[0] for row in csv.reader(file)] == ["ORDER_DETAILS", "1", "ABC-1", "2"]
+
+
+def test_parquet_export_leaves_out_order_numbers_that_arent_integers(logger, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    filename = str(tmp_path / "orders.parquet")
+    export_handler = ExportHandler(logger=logger, batch_size=1)
+    assert export_handler.export(iter(ROWS), filename) == 2
+    assert export_handler.skipped == 1
+    assert pq.read_table(filename).column("ORDER_DETAILS").to_pylist() == [1, 2]
+    assert any("1 row(s) left out" in message for message in logger.messages)
+
+
+@pytest.mark.parametrize("start_index, first, last", [(0, 0, 99), (1, 1, 99), (10, 10, 99), (100, 100, 999), (1222, 1222, 9999)])
+def test_iter_indexing_runs_to_the_last_index_with_as_many_digits(logger, tmp_path, start_index, first, last):
+    excel_handler = ExcelHandler(logger=logger, filename=str(tmp_path / "boltworld.xlsx"))
+    rows = list(excel_handler.iter_indexing(start_index))
+    assert rows[0] == [first] and rows[-1] == [last] and len(rows) == last - first + 1
@@ -0,0 +1,81 @@
+
+# Tests of FederatedSearch
+
+# IMPORTS!
+import json
+import os
+import openpyxl
+import pytest
+from PDF_Automation import FederatedSearch
+
+HEADERS = ["ORDER_DETAILS", "DATE", "TIME", "USER"]
+
+
+def make_ledger(filename, orders):
+    wb = openpyxl.Workbook()
+    wb.active.append(HEADERS)
+    for order in orders:
+        wb.active.append(order)
+    wb.save(filename)
+    return filename
+
+
+@pytest.fixture
+def ledgers(tmp_path):
+    return [
+        make_ledger(str(tmp_path / "2025.xlsx"), [[100 + i, "01-06-2025", "10:00 AM", "alice"] for i in range(3)]),
+        make_ledger(str(tmp_path / "2026.xlsx"), [[200 + i, "01-06-2026", "10:00 AM", "alice"] for i in range(3)]),
+    ]
+
+
+@pytest.fixture
+def federated_search(ledgers, tmp_path):
+    federated_search = FederatedSearch(filenames=ledgers, metadata_filename=str(tmp_path / "meta.json"), workers=2)
+    yield federated_search
+    federated_search.close()
+
+
+def search(federated_search, _type, value, max_results=None):
+    return {os.path.basename(filename): [row[0] for row in rows]
+            for filename, rows in federated_search.search(_type, value, max_results=max_results)}
+
+
+def test_every_ledger_is_searched(federated_search):
+    assert search(federated_search, "order", "201") == {"2026.xlsx": [201]}
+    assert search(federated_search, "user", "alice") == {"2025.xlsx": [100, 101, 102], "2026.xlsx": [200, 201, 202]}
+
+
+def test_max_results_stops_the_search(federated_search):
+    results = search(federated_search, "user", "alice", max_results=4)
+    assert sum(len(rows) for rows in results.values()) == 4
+
+
+def test_metadata_skips_ledgers_that_cant_match(federated_search, ledgers, tmp_path):
+    # the first search collects the metadata of both ledgers
+    search(federated_search, "user", "alice")
+    with open(tmp_path / "meta.json", encoding='utf-8') as file:
+        metadata = json.load(file)
+    assert metadata[os.path.abspath(ledgers[0])]["min_order"] == 100
+    assert metadata[os.path.abspath(ledgers[0])]["users"] == ["alice"]
+
+    # garbling 2025.xlsx without changing its size or mtime, any search opening it fails from here on
+    stat = os.stat(ledgers[0])
+    with open(ledgers[0], 'wb') as file:
+        file.write(b"\0" * stat.st_size)
+    os.utime(ledgers[0], ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    reloaded = FederatedSearch(filenames=ledgers, metadata_filename=str(tmp_path / "meta.json"), workers=2)
+    try:
+        assert search(reloaded, "order", "201") == {"2026.xlsx": [201]}
+        assert search(reloaded, "date", "01-06-2026") == {"2026.xlsx": [200, 201, 202]}
+        assert search(reloaded, "user", "bob") == {}
+        with pytest.raises(Exception):
+            search(reloaded, "order", "101")
+    finally:
+        reloaded.close()
+
+
+def test_changed_ledgers_are_searched_again(federated_search, ledgers):
+    search(federated_search, "user", "alice")
+    make_ledger(ledgers[0], [[100, "01-06-2025", "10:00 AM", "alice"], [999, "01-06-2025", "10:00 AM", "bob"]])
+    assert search(federated_search, "order", "999") == {"2025.xlsx": [999]}
@@ -0,0 +1,151 @@
+
+# Tests of JobQueue and run_worker
+
+# IMPORTS!
+import multiprocessing
+import sqlite3
+import threading
+import time
+import pytest
+import PDF_Automation.job_queue as job_queue_module
+from PDF_Automation import ExcelHandler, PDFAutomation
+from PDF_Automation.job_queue import JobQueue, run_worker
+
+
+@pytest.fixture
+def job_queue(tmp_path):
+    queue = JobQueue(filename=str(tmp_path / "jobs.db"), max_attempts=2)
+    yield queue
+    queue.close()
+
+
+def test_claim_hands_out_each_job_once(job_queue):
+    job_id = job_queue.submit("a.pdf", user="alice")
+    job = job_queue.claim(worker_id="w1")
+    assert job["id"] == job_id and job["filename"].endswith("a.pdf") and job["user"] == "alice"
+    assert job_queue.claim(worker_id="w2") is None
+    assert job_queue.status(job_id)["status"] == "leased"
+
+
+def test_complete_stores_orders_until_committed(job_queue):
+    job_id = job_queue.submit("a.pdf")
+    job_queue.claim(worker_id="w1")
+    assert job_queue.complete(job_id, "w1", [[1, "01-01-2026", "10:00 AM", "u"]], flagged_pages=[(3, "timeout")])
+    assert job_queue.results() == [(job_id, [[1, "01-01-2026", "10:00 AM", "u"]])]
+    assert job_queue.status(job_id)["flagged_pages"] == [[3, "timeout"]]
+    job_queue.mark_committed([job_id])
+    assert job_queue.results() == []
+    assert job_queue.counts() == {"committed": 1}
+
+
+def test_fail_requeues_then_dead_letters(job_queue):
+    job_id = job_queue.submit("poison.pdf")
+    job_queue.claim(worker_id="w1")
+    job_queue.fail(job_id, "w1", "boom 1")
+    assert job_queue.status(job_id)["status"] == "queued"
+    job_queue.claim(worker_id="w1")
+    job_queue.fail(job_id, "w1", "boom 2")
+    assert job_queue.status(job_id)["status"] == "dead"
+    assert job_queue.dead_letters() == [{"id": job_id, "filename": job_queue.status(job_id)["filename"],
+                                         "attempts": 2, "error": "boom 2"}]
+    assert job_queue.claim(worker_id="w1") is None
+
+    job_queue.retry(job_id)
+    assert job_queue.claim(worker_id="w1")["id"] == job_id
+
+
+def test_expired_lease_is_taken_over_and_dead_lettered(job_queue):
+    job_id = job_queue.submit("slow.pdf")
+    job_queue.claim(worker_id="w1", lease_seconds=0)
+    time.sleep(0.01)
+    assert job_queue.claim(worker_id="w2", lease_seconds=0)["id"] == job_id
+    # the first worker lost its lease, its result is dropped
+    assert not job_queue.complete(job_id, "w1", [])
+    assert not job_queue.renew(job_id, "w1")
+    time.sleep(0.01)
+    assert job_queue.claim(worker_id="w3") is None
+    assert job_queue.status(job_id)["status"] == "dead"
+    assert job_queue.status(job_id)["error"] == "lease expired"
+
+
+def test_renew_extends_the_lease(job_queue):
+    job_id = job_queue.submit("a.pdf")
+    job_queue.claim(worker_id="w1", lease_seconds=0)
+    assert job_queue.renew(job_id, "w1", lease_seconds=60)
+    assert job_queue.claim(worker_id="w2") is None
+
+
+def test_journal_mode_defaults_to_rollback_journal(tmp_path, monkeypatch):
+    monkeypatch.delenv("QUEUE_JOURNAL_MODE", raising=False)
+    filename = str(tmp_path / "jobs.db")
+    JobQueue(filename=filename).close()
+    assert sqlite3.connect(filename).execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+
+    monkeypatch.setenv("QUEUE_JOURNAL_MODE", "wal")
+    JobQueue(filename=filename).close()
+    assert sqlite3.connect(filename).execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    with pytest.raises(AssertionError):
+        JobQueue(filename=filename, journal_mode="MEMORY")
+
+
+class SlowPDFHandler:
+    """Stands in for PDFHandler, taking delay seconds to extract one order.
+    """
+    flagged_pages = []
+    delay = 1.0
+
+    def __init__(self, filename, logger=None):
+        pass
+
+    def open(self):
+        pass
+
+    def fetch_order_details(self, o_type, user=None, **kwargs):
+        time.sleep(self.delay)
+        return [[1, "01-01-2026", "10:00 AM", user]]
+
+
+def test_worker_renews_the_lease_of_a_slow_pdf(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue_module, "PDFHandler", SlowPDFHandler)
+    filename = str(tmp_path / "jobs.db")
+    queue = JobQueue(filename=filename)
+    try:
+        job_id = queue.submit("slow.pdf", user="alice")
+        worker = threading.Thread(target=run_worker, args=(filename,), kwargs={"worker_id": "w1", "lease_seconds": 0.3})
+        worker.start()
+        time.sleep(0.6)
+        # well past the lease, but the heartbeat keeps renewing it
+        assert queue.claim(worker_id="w2", lease_seconds=0.3) is None
+        worker.join()
+        assert queue.results() == [(job_id, [[1, "01-01-2026", "10:00 AM", "alice"]])]
+    finally:
+        queue.close()
+
+
+def test_failed_commit_stops_the_workers(logger, tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue_module, "PDFHandler", SlowPDFHandler)
+    monkeypatch.setattr(SlowPDFHandler, "delay", 60.0)
+
+    def disk_full(self, job_queue, excel_handler, logger=None):
+        raise OSError(28, "No space left on device")
+    monkeypatch.setattr(PDFAutomation, "commit_queue_results", disk_full)
+
+    filename = str(tmp_path / "jobs.db")
+    queue = JobQueue(filename=filename)
+    queue.submit("slow.pdf")
+    queue.close()
+    started = time.monotonic()
+    with pytest.raises(OSError):
+        PDFAutomation().process_queue(queue_filename=filename, workers=1, commit_interval=0.2,
+                                      excel_handler=ExcelHandler(logger=logger, filename=str(tmp_path / "l.xlsx")))
+    assert time.monotonic() - started < 30
+    assert multiprocessing.active_children() == []
+
+
+def test_commit_logs_the_flagged_pages(logger, job_queue, tmp_path):
+    job_id = job_queue.submit("a.pdf")
+    job_queue.claim(worker_id="w1")
+    job_queue.complete(job_id, "w1", [[1, "01-01-2026", "10:00 AM", "u"]], flagged_pages=[(2, "took longer than 1 seconds")])
+    excel_handler = ExcelHandler(logger=logger, filename=str(tmp_path / "l.xlsx"))
+    assert PDFAutomation().commit_queue_results(job_queue, excel_handler, logger=logger) is None
+    assert any("flagged page=3" in message and "a.pdf" in message for message in logger.messages)
@@ -0,0 +1,70 @@
+
+# Tests of the isolated page extraction of PDFHandler
+
+# IMPORTS!
+import multiprocessing
+import time
+import PyPDF2
+import pytest
+from conftest import make_pdf
+from PDF_Automation import PDFHandler
+
+# the patched pages below reach the worker processes by forking
+pytestmark = pytest.mark.skipif(multiprocessing.get_start_method() != "fork", reason="needs the fork start method")
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    filename = str(tmp_path / "orders.pdf")
+    make_pdf(filename, [f"Order Number: {1000 + page}" for page in range(4)])
+    return filename
+
+
+def patch_page(monkeypatch, order_number, action):
+    """Runs action when the page of order_number is extracted, in the worker process.
+    """
+    extract_text = PyPDF2.PageObject.extract_text
+
+    def patched(self, *args, **kwargs):
+        text = extract_text(self, *args, **kwargs)
+        if f"Order Number: {order_number}" in text:
+            action()
+        return text
+    monkeypatch.setattr(PyPDF2.PageObject, "extract_text", patched)
+
+
+def extract(logger, pdf, **kwargs):
+    pdf_handler = PDFHandler(filename=pdf, logger=logger)
+    pdf_handler.open()
+    orders = pdf_handler.fetch_order_details(o_type="web", isolated=True, user="tester", **kwargs)
+    return [order[0] for order in orders], pdf_handler.flagged_pages
+
+
+def test_isolated_extraction_reads_every_page(logger, pdf):
+    assert extract(logger, pdf, page_timeout=10) == ([1000, 1001, 1002, 1003], [])
+
+
+def test_a_hanging_page_is_killed_and_the_rest_extracted(logger, pdf, monkeypatch):
+    patch_page(monkeypatch, 1001, lambda: time.sleep(60))
+    started = time.monotonic()
+    orders, flagged_pages = extract(logger, pdf, page_timeout=1)
+    assert time.monotonic() - started < 10
+    assert orders == [1000, 1002, 1003]
+    assert flagged_pages == [(1, "took longer than 1 seconds")]
+    assert any("flagged page=2" in message for message in logger.messages)
+    assert multiprocessing.active_children() == []
+
+
+def test_a_page_over_the_memory_budget_is_killed_from_the_parent(logger, pdf, monkeypatch):
+    # without the address space limit inside the worker, like on Windows
+    resource = pytest.importorskip("resource")
+    monkeypatch.setattr(resource, "setrlimit", lambda *args: None)
+
+    def allocate():
+        memory = b"x" * (300 * 1024 * 1024)
+        time.sleep(60)
+        return memory
+    patch_page(monkeypatch, 1002, allocate)
+    orders, flagged_pages = extract(logger, pdf, page_timeout=30, page_memory_mb=100)
+    assert orders == [1000, 1001, 1003]
+    assert flagged_pages == [(2, "went over 100 MB of memory")]
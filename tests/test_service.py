@@ -0,0 +1,55 @@
+
+# Tests of LedgerService through its ServiceClient
+
+# IMPORTS!
+import socket
+import threading
+import time
+import pytest
+from PDF_Automation import ExcelHandler, LedgerService, ServiceClient
+
+HEADERS = ["ORDER_DETAILS", "DATE", "TIME", "USER"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def excel_handler(logger, tmp_path):
+    excel_handler = ExcelHandler(logger=logger, filename=str(tmp_path / "boltworld.xlsx"))
+    excel_handler.configure_rollups(str(tmp_path / "rollups.json"))
+    wb = excel_handler.open_file(headers=HEADERS, create_file=True)
+    excel_handler.write(wb.active, data=[[1, "01-01-2026", "10:00 AM", "alice"]], show_duplicates=False)
+    excel_handler.save_in_background(wb).result()
+    return excel_handler
+
+
+@pytest.fixture
+def client(logger, excel_handler, tmp_path):
+    port = free_port()
+    service = LedgerService(excel_handler=excel_handler, queue_filename=str(tmp_path / "jobs.db"), workers=0, logger=logger)
+    threading.Thread(target=service.run, kwargs={"port": port}, daemon=True).start()
+    client = ServiceClient(url=f"http://127.0.0.1:{port}", timeout=5)
+    for _ in range(50):
+        try:
+            client.health()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return client
+
+
+def test_search_and_health(client):
+    assert client.search("order", "1") == (100, [[1, "01-01-2026", "10:00 AM", "alice"]])
+    assert client.search("user", "bob") == (103, [])
+    assert client.health()["status"] == "ok"
+
+
+def test_stats_come_from_the_service_rollups(client):
+    assert client.stats() == {
+        "enabled": True, "per_date": [["01-01-2026", 1]], "per_user": [["alice", 1]],
+        "per_date_user": [["01-01-2026", "alice", 1]],
+    }
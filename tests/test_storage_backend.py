@@ -0,0 +1,88 @@
+
+# Tests of ParquetArchive kept in sync with the ledger
+
+# IMPORTS!
+import openpyxl
+import pytest
+from PDF_Automation import ExcelHandler, ParquetArchive
+
+pytest.importorskip("pyarrow")
+
+HEADERS = ["ORDER_DETAILS", "DATE", "TIME", "USER"]
+
+
+def order(order_number, user="u"):
+    return [order_number, "01-01-2026", "10:00 AM", user]
+
+
+def write_and_save(excel_handler, orders):
+    wb = excel_handler.open_file(headers=HEADERS, create_file=True)
+    excel_handler.write(wb.active, data=orders, show_duplicates=False)
+    assert excel_handler.save_in_background(wb).result() is None
+
+
+def found(excel_handler, order_number):
+    return [row[0] for row in excel_handler.iter_search("order", str(order_number))]
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return str(tmp_path / "boltworld.xlsx")
+
+
+@pytest.fixture
+def archive(tmp_path):
+    return ParquetArchive(directory=str(tmp_path / "archive"))
+
+
+def archived_handler(logger, ledger, archive):
+    excel_handler = ExcelHandler(logger=logger, filename=ledger)
+    excel_handler.add_backend(archive, use_for_search=True)
+    return excel_handler
+
+
+def test_saves_keep_the_archive_in_sync(logger, ledger, archive):
+    excel_handler = archived_handler(logger, ledger, archive)
+    write_and_save(excel_handler, [order(1)])
+    write_and_save(excel_handler, [order(2)])
+    assert archive.is_synced(ledger) and archive.is_migrated(ledger)
+    assert archive.migrate_from_xlsx(ledger) == 0
+    assert found(excel_handler, 2) == [2]
+
+
+def test_rows_added_in_excel_are_still_found(logger, ledger, archive):
+    excel_handler = archived_handler(logger, ledger, archive)
+    write_and_save(excel_handler, [order(1)])
+
+    wb = openpyxl.load_workbook(ledger)
+    wb.active.append(order(2))
+    wb.save(ledger)
+    assert not archive.is_synced(ledger) and not archive.is_migrated(ledger)
+    assert found(excel_handler, 2) == [2]
+
+    # the next save doesn't pretend the archive caught up with the row added in Excel
+    write_and_save(excel_handler, [order(3)])
+    assert not archive.is_synced(ledger)
+    assert archive.migrate_from_xlsx(ledger) == 1
+    assert archive.is_synced(ledger)
+    assert sorted(archive.query(columns=["ORDER_DETAILS"]).column("ORDER_DETAILS").to_pylist()) == [1, 2, 3]
+
+
+def test_rows_saved_by_a_desk_without_the_archive_are_still_found(logger, ledger, archive):
+    excel_handler = archived_handler(logger, ledger, archive)
+    write_and_save(excel_handler, [order(1)])
+    write_and_save(ExcelHandler(logger=logger, filename=ledger), [order(2)])
+    assert found(excel_handler, 2) == [2]
+    assert archive.migrate_from_xlsx(ledger) == 1
+    assert found(excel_handler, 2) == [2]
+
+
+def test_rows_the_archive_cant_hold_are_searched_in_the_xlsx_file(logger, ledger, archive):
+    wb = openpyxl.Workbook()
+    wb.active.append(HEADERS)
+    wb.active.append(order("ABC-1"))
+    wb.active.append(order(2))
+    wb.save(ledger)
+    assert archive.migrate_from_xlsx(ledger) == 1
+    assert archive.is_migrated(ledger) and not archive.is_synced(ledger)
+    assert found(archived_handler(logger, ledger, archive), "ABC-1") == ["ABC-1"]